@@ -0,0 +1,80 @@
+import gzip
+import hashlib
+import os
+import tempfile
+from typing import Dict, Any, Union, Set, Iterable, Optional
+
+DEFAULT_BLOB_DIR = "blobs"
+
+class BlobStore:
+    """Content-addressed store that keeps one gzip-compressed copy of each distinct payload."""
+
+    def __init__(self, root: str = DEFAULT_BLOB_DIR):
+        self.root = root
+        self._known: Set[str] = set()
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.gz")
+
+    def put(self, data: Union[str, bytes]) -> Dict[str, Any]:
+        """Store a payload (if not already present) and return a reference to it."""
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest in self._known or os.path.exists(self.path_for(digest)):
+            self._known.add(digest)
+            return {"blob": f"sha256:{digest}", "bytes": len(raw)}
+        return self.put_stream([raw])
+
+    def put_stream(self, chunks: Iterable[bytes], max_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """Store a payload as it arrives, hashing and compressing chunk by chunk.
+
+        With max_bytes, anything past the cap is dropped and the reference says so.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        # Write to a temp file first so a crash never leaves a truncated blob behind
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.root)
+        sha = hashlib.sha256()
+        size, truncated = 0, False
+        try:
+            with os.fdopen(fd, "wb") as raw_file, gzip.GzipFile(fileobj=raw_file, mode="wb") as f:
+                for chunk in chunks:
+                    if max_bytes is not None and size + len(chunk) > max_bytes:
+                        chunk = chunk[:max_bytes - size]
+                        truncated = True
+                    sha.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+                    if truncated:
+                        break
+            digest = sha.hexdigest()
+            path = self.path_for(digest)
+            if digest in self._known or os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._known.add(digest)
+        ref = {"blob": f"sha256:{digest}", "bytes": size}
+        if truncated:
+            ref["truncated"] = True
+        return ref
+
+    def get(self, ref: Union[str, Dict[str, Any]]) -> bytes:
+        """Load a payload back from a reference returned by put()."""
+        if isinstance(ref, dict):
+            ref = ref["blob"]
+        digest = ref.split(":", 1)[-1]
+        with gzip.open(self.path_for(digest), "rb") as f:
+            return f.read()
+
+_stores: Dict[str, BlobStore] = {}
+
+def open_blob_store(root: str = DEFAULT_BLOB_DIR) -> BlobStore:
+    """Return the shared BlobStore for a directory, so dedup works across pages in one run."""
+    if root not in _stores:
+        _stores[root] = BlobStore(root)
+    return _stores[root]
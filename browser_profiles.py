@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Any, TypedDict
+from playwright.async_api import async_playwright
+from resources import process_tree_rss_mb
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = "default"
+PROFILE_ENV_VAR = "BROWSER_PROFILE"
+
+class BrowserProfile(TypedDict):
+    args: List[str]
+    viewport: Dict[str, int]
+
+# Flags every scraper needs to run headless in a container
+COMMON_ARGS = [
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-gpu',
+    '--disable-software-rasterizer',
+    '--disable-extensions'
+]
+
+BROWSER_PROFILES: Dict[str, BrowserProfile] = {
+    "default": {
+        "args": COMMON_ARGS,
+        "viewport": {'width': 1920, 'height': 1080}
+    },
+    # Packs the most pages into a small machine: few renderer processes, tiny caches, capped JS heaps
+    "low-memory": {
+        "args": COMMON_ARGS + [
+            '--renderer-process-limit=2',
+            '--process-per-site',
+            '--disable-features=site-per-process,Translate,MediaRouter',
+            '--disk-cache-size=33554432',
+            '--media-cache-size=1048576',
+            '--js-flags=--max-old-space-size=256',
+            '--disable-background-networking',
+            '--disable-component-update',
+            '--disable-breakpad',
+            '--mute-audio'
+        ],
+        "viewport": {'width': 1024, 'height': 768}
+    },
+    # Keeps every tab running at full speed and caches aggressively; needs memory to spare
+    "throughput": {
+        "args": COMMON_ARGS + [
+            '--disable-background-timer-throttling',
+            '--disable-backgrounding-occluded-windows',
+            '--disable-renderer-backgrounding',
+            '--disable-ipc-flooding-protection',
+            '--disk-cache-size=268435456',
+            '--disable-background-networking',
+            '--mute-audio'
+        ],
+        "viewport": {'width': 1280, 'height': 800}
+    }
+}
+
+def profile_name_from_env() -> str:
+    return os.environ.get(PROFILE_ENV_VAR, DEFAULT_PROFILE)
+
+def get_profile(name: Optional[str] = None) -> BrowserProfile:
+    """Look up a profile by name (default: $BROWSER_PROFILE, else "default")."""
+    name = name or profile_name_from_env()
+    if name not in BROWSER_PROFILES:
+        raise ValueError(f"Unknown browser profile '{name}' (choose from {', '.join(BROWSER_PROFILES)})")
+    return BROWSER_PROFILES[name]
+
+def merge_args(*arg_lists: List[str]) -> List[str]:
+    """Combine Chromium flag lists, later lists winning.
+
+    Chromium only honours the last --disable-features/--enable-features switch,
+    so their comma-separated values are merged into one switch instead.
+    """
+    merged: Dict[str, str] = {}
+    features: Dict[str, List[str]] = {"--disable-features": [], "--enable-features": []}
+    for args in arg_lists:
+        for arg in args:
+            name, _, value = arg.partition("=")
+            if name in features:
+                features[name].extend(v for v in value.split(",") if v and v not in features[name])
+            else:
+                merged[name] = arg
+    for name, values in features.items():
+        if values:
+            merged[name] = f"{name}={','.join(values)}"
+    return list(merged.values())
+
+def launch_args(profile: BrowserProfile, extra_args: Optional[List[str]] = None) -> List[str]:
+    """The profile's flags plus a script's own (e.g. stealth or media flags)."""
+    return merge_args(profile["args"], extra_args or [])
+
+async def benchmark_profile(playwright, name: str, urls: List[str], pages: int, concurrency: int) -> Dict[str, Any]:
+    """Load `pages` pages `concurrency` at a time and report throughput and memory per page."""
+    profile = get_profile(name)
+    browser = await playwright.chromium.launch(headless=True, args=launch_args(profile))
+    context = await browser.new_context(viewport=profile["viewport"])
+    # Memory of the driver and the idle browser, so only what the pages add is attributed to them
+    baseline = process_tree_rss_mb(os.getpid())
+    peak = baseline
+    failures = 0
+    remaining = list(range(pages))
+    loop = asyncio.get_running_loop()
+
+    async def sample():
+        nonlocal peak
+        while True:
+            peak = max(peak, process_tree_rss_mb(os.getpid()))
+            await asyncio.sleep(0.5)
+
+    async def worker():
+        nonlocal failures
+        while remaining:
+            index = remaining.pop()
+            page = await context.new_page()
+            try:
+                await page.goto(urls[index % len(urls)], wait_until="load", timeout=60000)
+                await page.content()
+            except Exception as e:
+                failures += 1
+                logger.warning(f"[{name}] {urls[index % len(urls)]}: {e}")
+            finally:
+                await page.close()
+
+    sampler = asyncio.create_task(sample())
+    start = loop.time()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        elapsed = loop.time() - start
+        sampler.cancel()
+        await context.close()
+        await browser.close()
+
+    return {
+        "profile": name,
+        "pages": pages,
+        "failures": failures,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "pages_per_second": round(pages / elapsed, 3) if elapsed else None,
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(peak, 1),
+        "rss_per_page_mb": round((peak - baseline) / concurrency, 1)
+    }
+
+async def benchmark(profiles: List[str], urls: List[str], pages: int, concurrency: int) -> List[Dict[str, Any]]:
+    results = []
+    async with async_playwright() as p:
+        for name in profiles:
+            logger.info(f"Benchmarking '{name}' with {pages} pages, {concurrency} at a time")
+            results.append(await benchmark_profile(p, name, urls, pages, concurrency))
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare browser profiles: pages/s and RSS per concurrent page")
+    parser.add_argument("urls", nargs="+", help="Pages to load (cycled through)")
+    parser.add_argument("--profiles", default=",".join(BROWSER_PROFILES), help="Comma-separated profiles to compare")
+    parser.add_argument("--pages", type=int, default=20, help="Pages to load per profile")
+    parser.add_argument("--concurrency", type=int, default=4, help="Pages open at once")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    return parser.parse_args()
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s UTC - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    args = parse_args()
+    profiles = [name.strip() for name in args.profiles.split(",") if name.strip()]
+    for name in profiles:
+        get_profile(name)  # Fail before launching anything
+    results = asyncio.run(benchmark(profiles, args.urls, args.pages, args.concurrency))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'profile':<12} {'pages/s':>8} {'failures':>8} {'peak RSS MB':>12} {'RSS/page MB':>12}")
+    for result in results:
+        print(f"{result['profile']:<12} {result['pages_per_second']:>8} {result['failures']:>8} {result['peak_rss_mb']:>12} {result['rss_per_page_mb']:>12}")
+
+if __name__ == "__main__":
+    main()
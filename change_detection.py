@@ -0,0 +1,116 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from typing import Dict, Optional, Any
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:  # Falls back to hashing the whole document's text
+    HTMLParser = None
+
+DEFAULT_FINGERPRINT_FILE = "fingerprints.db"
+DEFAULT_CONTENT_SELECTOR = "main, article, [role=main]"
+
+FRESH = "fresh"
+CARRIED_OVER = "carried_over"
+
+NON_CONTENT = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+TAGS = re.compile(r'<[^>]+>')
+WHITESPACE = re.compile(r'\s+')
+
+def content_hash(html: str, selector: str = DEFAULT_CONTENT_SELECTOR) -> str:
+    """Hash of the visible text in the page's main content region.
+
+    Only text counts, so rotating ads, nonces and asset hashes elsewhere in the
+    markup don't make an unchanged article look new.
+    """
+    if HTMLParser is not None:
+        tree = HTMLParser(html)
+        for node in tree.css("script, style, noscript, template"):
+            node.decompose()
+        region = tree.css_first(selector) or tree.body
+        text = region.text(deep=True, separator=" ") if region is not None else ""
+    else:
+        text = TAGS.sub(" ", NON_CONTENT.sub(" ", html))
+    return hashlib.sha256(WHITESPACE.sub(" ", text).strip().encode("utf-8")).hexdigest()
+
+def conditional_headers(previous: Dict[str, Any]) -> Dict[str, str]:
+    headers = {}
+    if previous.get("etag"):
+        headers["If-None-Match"] = previous["etag"]
+    if previous.get("last_modified"):
+        headers["If-Modified-Since"] = previous["last_modified"]
+    return headers
+
+class FingerprintStore:
+    """Per-URL validators, content hash and last extracted record, for skipping unchanged pages."""
+
+    def __init__(self, path: str = DEFAULT_FINGERPRINT_FILE):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                url TEXT NOT NULL,
+                schema_id TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT NOT NULL,
+                data TEXT NOT NULL,
+                checked REAL NOT NULL,
+                PRIMARY KEY (url, schema_id)
+            )
+        """)
+        self.db.commit()
+
+    def get(self, url: str, schema_id: str) -> Optional[Dict[str, Any]]:
+        row = self.db.execute(
+            "SELECT etag, last_modified, content_hash, data FROM fingerprints WHERE url = ? AND schema_id = ?",
+            (url, schema_id)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "content_hash": row[2], "data": json.loads(row[3])}
+
+    def put(self, url: str, schema_id: str, headers: Dict[str, str], digest: str, data: Dict[str, Any]):
+        self.db.execute(
+            "INSERT OR REPLACE INTO fingerprints (url, schema_id, etag, last_modified, content_hash, data, checked) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, schema_id, headers.get("etag"), headers.get("last-modified"), digest, json.dumps(data, ensure_ascii=False), time.time())
+        )
+        self.db.commit()
+
+    def touch(self, url: str, schema_id: str, headers: Dict[str, str]):
+        """Record a check that found the page unchanged, keeping any newer validators."""
+        self.db.execute(
+            "UPDATE fingerprints SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), checked = ? WHERE url = ? AND schema_id = ?",
+            (headers.get("etag"), headers.get("last-modified"), time.time(), url, schema_id)
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+def open_fingerprint_store(schema: Dict[str, Any], path: Optional[str] = None) -> Optional[FingerprintStore]:
+    config = schema.get("change_detection")
+    if not config:
+        return None
+    config = config if isinstance(config, dict) else {}
+    return FingerprintStore(path or config.get("file", DEFAULT_FINGERPRINT_FILE))
+
+async def is_unchanged(request_context, url: str, previous: Dict[str, Any], selector: str) -> Optional[Dict[str, str]]:
+    """Cheap check with a plain HTTP request: the response headers if the page is unchanged, else None.
+
+    A 304 to the conditional request settles it; otherwise the content region is
+    hashed and compared, since many servers send no validators at all.
+    """
+    response = await request_context.get(url, headers=conditional_headers(previous), fail_on_status_code=False, timeout=30000)
+    try:
+        if response.status == 304:
+            return response.headers
+        if response.ok and content_hash(await response.text(), selector) == previous["content_hash"]:
+            return response.headers
+        return None
+    finally:
+        await response.dispose()
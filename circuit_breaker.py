@@ -0,0 +1,95 @@
+import logging
+import time
+from typing import Dict
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Stops sending requests to a failing host, then lets a single probe through to test recovery."""
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0, max_reset_timeout: float = 600.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.probe_started = 0.0
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; moves an expired open circuit to half-open."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+            logger.info(f"Circuit for {self.name} half-open, probing")
+        # A probe that never reported back (e.g. the page crashed) must not block the host forever
+        if self.state == HALF_OPEN and (not self.probe_in_flight or time.monotonic() - self.probe_started >= self.reset_timeout):
+            self.probe_in_flight = True
+            self.probe_started = time.monotonic()
+            return True
+        return False
+
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = CLOSED
+        self.failures = 0
+        self.reset_timeout = self.base_reset_timeout
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            # The probe failed: stay open, backing off longer each time
+            self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            self.trip()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        logger.warning(f"Circuit for {self.name} opened after {self.failures} failures; retrying in {self.reset_timeout:.0f}s")
+
+class HostCircuitBreakers:
+    """One circuit breaker per host."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0, max_reset_timeout: float = 600.0):
+        self.settings = {
+            "failure_threshold": failure_threshold,
+            "reset_timeout": reset_timeout,
+            "max_reset_timeout": max_reset_timeout
+        }
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, url: str) -> CircuitBreaker:
+        host = urlparse(url).netloc
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(host, **self.settings)
+        return self.breakers[host]
+
+    def allow(self, url: str) -> bool:
+        return self.get(url).allow()
+
+    def is_open(self, url: str) -> bool:
+        return self.get(url).is_open()
+
+    def record(self, url: str, ok: bool):
+        if ok:
+            self.get(url).record_success()
+        else:
+            self.get(url).record_failure()
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import statistics
+from typing import Dict, List, Optional, Any, Union
+from resources import available_memory_mb
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DECISION_INTERVAL = 5.0  # seconds between adjustments
+DEFAULT_TARGET_LATENCY = 20.0  # median seconds per page before backing off
+DEFAULT_MAX_ERROR_RATE = 0.2
+DEFAULT_MAX_LOOP_LAG = 0.5  # seconds the event loop may fall behind
+DEFAULT_MIN_FREE_MB = 512
+DECREASE_FACTOR = 0.5
+LAG_PROBE_INTERVAL = 0.1
+
+def concurrency_bounds(config: Union[int, Dict[str, Any], None]) -> Dict[str, Any]:
+    """Accept the schema's concurrency as a fixed number of pages or an adaptive config."""
+    if config is None:
+        config = 1
+    if isinstance(config, int):
+        return {"min": config, "max": config, "initial": config}
+    bounds = {"min": 1, "max": 8, **config}
+    bounds.setdefault("initial", bounds["min"])
+    return bounds
+
+class AdaptiveConcurrency:
+    """AIMD limit on concurrently processed pages.
+
+    The limit grows by one page per interval while pages are fast, mostly succeed,
+    the event loop keeps up and memory is free, and halves as soon as one of those fails.
+    A fixed concurrency is the same controller with min == max, and never adjusts.
+    """
+
+    def __init__(self, config: Union[int, Dict[str, Any], None], metrics: Optional[Dict[str, Any]] = None):
+        bounds = concurrency_bounds(config)
+        self.min = max(1, bounds["min"])
+        self.max = max(self.min, bounds["max"])
+        self.limit = min(max(bounds["initial"], self.min), self.max)
+        self.interval = bounds.get("interval", DEFAULT_DECISION_INTERVAL)
+        self.target_latency = bounds.get("target_latency", DEFAULT_TARGET_LATENCY)
+        self.max_error_rate = bounds.get("max_error_rate", DEFAULT_MAX_ERROR_RATE)
+        self.max_loop_lag = bounds.get("max_loop_lag", DEFAULT_MAX_LOOP_LAG)
+        self.min_free_mb = bounds.get("min_free_mb", DEFAULT_MIN_FREE_MB)
+        self.active = 0
+        self.peak_active = 0
+        self._condition = asyncio.Condition()
+        self._tasks: List[asyncio.Task] = []
+        # Feedback gathered since the last decision
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.max_lag = 0.0
+        self.saturated = False
+        self.decisions: List[Dict[str, Any]] = []
+        if metrics is not None:
+            metrics["concurrency"] = {"min": self.min, "max": self.max, "initial": self.limit, "decisions": self.decisions}
+        self.metrics = metrics
+
+    @property
+    def adaptive(self) -> bool:
+        return self.min < self.max
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            if self.active >= self.limit:
+                self.saturated = True
+
+    async def release(self):
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def record(self, latency: float, ok: bool):
+        self.latencies.append(latency)
+        if not ok:
+            self.errors += 1
+
+    def start(self):
+        if self.adaptive:
+            self._tasks = [asyncio.create_task(self._watch_lag()), asyncio.create_task(self._adjust_periodically())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.metrics is not None:
+            self.metrics["concurrency"].update({"final": self.limit, "peak_active": self.peak_active})
+
+    async def _watch_lag(self):
+        # A sleep that overshoots means something hogged the loop (regex/base64 work, huge evaluate results)
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            self.max_lag = max(self.max_lag, loop.time() - start - LAG_PROBE_INTERVAL)
+
+    async def _adjust_periodically(self):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.adjust(loop.time() - started)
+
+    def _pressure(self, latency: Optional[float], error_rate: Optional[float], free_mb: Optional[float]) -> Optional[str]:
+        """The first reason to back off, if any."""
+        if free_mb is not None and free_mb < self.min_free_mb:
+            return f"free memory {free_mb:.0f}MB below {self.min_free_mb}MB"
+        if error_rate is not None and error_rate > self.max_error_rate:
+            return f"error rate {error_rate:.0%} above {self.max_error_rate:.0%}"
+        if self.max_lag > self.max_loop_lag:
+            return f"event loop lag {self.max_lag * 1000:.0f}ms above {self.max_loop_lag * 1000:.0f}ms"
+        if latency is not None and latency > self.target_latency:
+            return f"median page time {latency:.1f}s above {self.target_latency:.1f}s"
+        return None
+
+    async def adjust(self, elapsed: float):
+        latency = statistics.median(self.latencies) if self.latencies else None
+        error_rate = self.errors / len(self.latencies) if self.latencies else None
+        free_mb = available_memory_mb()
+        previous = self.limit
+        reason = self._pressure(latency, error_rate, free_mb)
+        if reason:
+            self.limit = max(self.min, int(self.limit * DECREASE_FACTOR))
+        elif self.saturated and self.latencies:
+            # Only grow when the current limit was actually used and pages completed under it
+            self.limit = min(self.max, self.limit + 1)
+            reason = "healthy at the limit"
+
+        if self.limit != previous:
+            decision = {
+                "at": round(elapsed, 1),
+                "from": previous,
+                "to": self.limit,
+                "reason": reason,
+                "pages": len(self.latencies),
+                "median_latency": round(latency, 2) if latency is not None else None,
+                "error_rate": round(error_rate, 3) if error_rate is not None else None,
+                "loop_lag_ms": round(self.max_lag * 1000),
+                "free_mb": round(free_mb) if free_mb is not None else None
+            }
+            self.decisions.append(decision)
+            logger.info(f"Concurrency {previous} -> {self.limit}: {reason}")
+            async with self._condition:
+                self._condition.notify_all()
+
+        self.latencies, self.errors, self.max_lag = [], 0, 0.0
+        self.saturated = self.active >= self.limit
@@ -0,0 +1,275 @@
+import asyncio
+import logging
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Any, Tuple
+from urllib.parse import urljoin, urlparse
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_FEEDS = 3  # candidate feeds tried per page
+DEFAULT_MAX_ITEMS = 200
+DEFAULT_MAX_FEED_BYTES = 5 * 1024 * 1024
+DEFAULT_MAX_PAGE_BYTES = 512 * 1024  # read of the listing page while looking for its <head> feed links
+FEED_TIMEOUT = 30  # seconds
+CHUNK_BYTES = 64 * 1024
+
+# Schema features only a rendered page can produce; with any of them set, a feed can't stand in for the browser
+RENDER_ONLY_KEYS = ["post_actions", "enable_media_capture", "enable_hidden_links", "scan_javascript", "enable_base64_decode", "response_capture", "mutation_capture"]
+
+FEED_TYPES = ("application/rss+xml", "application/atom+xml", "application/rdf+xml")
+LINK_TAG = re.compile(r'<link\b[^>]*>', re.IGNORECASE)
+TAG_ATTRIBUTE = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+SITEMAP_LINE = re.compile(r'^\s*sitemap\s*:\s*(\S+)', re.IGNORECASE | re.MULTILINE)
+TAGS = re.compile(r'<[^>]+>')
+WHITESPACE = re.compile(r'\s+')
+
+# Item fields of an array property, and the feed entry field that fills each
+ENTRY_FIELDS = {
+    "title": "title", "text": "title", "name": "title", "headline": "title",
+    "link": "link", "url": "link", "href": "link",
+    "description": "description", "summary": "description", "standfirst": "description",
+    "image": "image", "thumb": "image", "thumbnail": "image",
+    "published": "published", "date": "published"
+}
+
+# Tags are matched on their local name, so RSS, Atom, RDF and sitemap namespaces all work
+ENTRY_TAGS = {"item", "entry", "url"}
+# Wrappers whose children describe the entry itself (news:news in news sitemaps, media:group in RSS)
+CONTAINER_TAGS = {"news", "group"}
+
+def local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+def clean_text(text: Optional[str]) -> Optional[str]:
+    if not text:
+        return None
+    return WHITESPACE.sub(" ", TAGS.sub(" ", text)).strip() or None
+
+def alternate_feeds(html: str, base_url: str) -> List[str]:
+    """Feed URLs advertised with <link rel="alternate" type="application/rss+xml" ...>."""
+    feeds = []
+    for tag in LINK_TAG.findall(html):
+        attributes = {name.lower(): first or second for name, first, second in TAG_ATTRIBUTE.findall(tag)}
+        if "alternate" in attributes.get("rel", "").lower().split() and attributes.get("type", "").lower() in FEED_TYPES and attributes.get("href"):
+            feeds.append(urljoin(base_url, attributes["href"]))
+    return feeds
+
+def entry_fields(element: ET.Element):
+    for child in element:
+        if local_name(child.tag) in CONTAINER_TAGS:
+            yield from child
+        else:
+            yield child
+
+def read_entry(element: ET.Element) -> Dict[str, Any]:
+    """One RSS item, Atom entry or sitemap <url> as {title, link, description, image, published}."""
+    entry: Dict[str, Any] = {}
+    for child in entry_fields(element):
+        name = local_name(child.tag)
+        text = (child.text or "").strip()
+        if name == "title" and "title" not in entry:
+            entry["title"] = clean_text(text)
+        elif name == "link" and "link" not in entry:
+            # Atom links are attributes; RSS links are text
+            if child.get("href"):
+                if child.get("rel", "alternate") == "alternate":
+                    entry["link"] = child.get("href").strip()
+            elif text:
+                entry["link"] = text
+        elif name == "loc" and "link" not in entry:
+            entry["link"] = text
+        elif name in ("description", "summary") and "description" not in entry:
+            entry["description"] = clean_text(text)
+        elif name in ("pubDate", "published", "updated", "lastmod", "publication_date") and "published" not in entry:
+            entry["published"] = text or None
+        elif name == "image" and "image" not in entry:
+            # image:image in sitemaps
+            loc = next((grandchild for grandchild in child if local_name(grandchild.tag) == "loc"), None)
+            if loc is not None and loc.text:
+                entry["image"] = loc.text.strip()
+        elif name in ("thumbnail", "content", "enclosure") and child.get("url") and "image" not in entry:
+            if name == "thumbnail" or child.get("type", "image/").startswith("image/") or child.get("medium") == "image":
+                entry["image"] = child.get("url")
+        elif name == "content" and "description" not in entry and text:
+            entry["description"] = clean_text(text)
+    return entry
+
+class FeedParser:
+    """Entries of an RSS/Atom feed or sitemap, plus the child sitemaps of a sitemap index.
+
+    Fed the body chunk by chunk as it downloads: each entry is read when its closing
+    tag arrives and then cleared, and once max_items entries are in, the rest of the
+    body needn't be downloaded at all.
+    """
+
+    def __init__(self, max_items: int = DEFAULT_MAX_ITEMS):
+        self.max_items = max_items
+        self.parser = ET.XMLPullParser(events=("start", "end"))
+        self.entries: List[Dict[str, Any]] = []
+        self.children: List[str] = []
+        self.in_index = False
+
+    def feed(self, chunk: bytes) -> bool:
+        """Parse the next chunk of the body; True once enough entries have been read."""
+        self.parser.feed(chunk)
+        for event, element in self.parser.read_events():
+            name = local_name(element.tag)
+            if event == "start":
+                if name == "sitemapindex":
+                    self.in_index = True
+                continue
+            if self.in_index and name == "sitemap":
+                for child in element:
+                    if local_name(child.tag) == "loc" and child.text:
+                        self.children.append(child.text.strip())
+                element.clear()
+            elif name in ENTRY_TAGS and not self.in_index:
+                entry = read_entry(element)
+                element.clear()
+                if entry.get("link"):
+                    self.entries.append(entry)
+                    if len(self.entries) >= self.max_items:
+                        return True
+        return False
+
+    def close(self):
+        """End of the body; raises ParseError if the document was cut short."""
+        self.parser.close()
+
+def feed_properties(schema: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+    """For each array property a feed should fill: item field -> feed entry field.
+
+    config["properties"] is a list of property names (fields mapped by name) or
+    an explicit {property: {item field: entry field}} mapping.
+    """
+    wanted = config.get("properties") or []
+    if isinstance(wanted, dict):
+        return {prop: dict(mapping) for prop, mapping in wanted.items() if prop in schema["properties"]}
+    mappings = {}
+    for prop in wanted:
+        value = schema["properties"].get(prop)
+        if not value or value.get("type") != "array":
+            continue
+        fields = value.get("items", {}).get("properties", {})
+        mappings[prop] = {field: ENTRY_FIELDS.get(field, field) for field in fields}
+    return mappings
+
+def fill_properties(entries: List[Dict[str, Any]], mappings: Dict[str, Dict[str, str]], schema: Dict[str, Any]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """Array property values built from feed entries, or None if the feed lacks a requested field."""
+    filled = {}
+    for prop, mapping in mappings.items():
+        # Every requested field has to show up somewhere in the feed, or the browser is needed after all
+        if not entries or any(not any(entry.get(source) for entry in entries) for source in mapping.values()):
+            return None
+        value = schema["properties"][prop]
+        filter_pattern = re.compile(value["filter"]["pattern"], re.IGNORECASE) if "filter" in value else None
+        items = []
+        for entry in entries:
+            item = {field: entry.get(source) for field, source in mapping.items()}
+            if filter_pattern and not filter_pattern.search(item.get(value["filter"]["attribute"]) or ""):
+                continue
+            items.append(item)
+        filled[prop] = items
+    return filled
+
+def open_feed_http(user_agent: Optional[str] = None) -> aiohttp.ClientSession:
+    """HTTP client for feed discovery; pages, robots.txt and feeds share its connections."""
+    return aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=FEED_TIMEOUT),
+        headers={"User-Agent": user_agent} if user_agent else None
+    )
+
+class FeedDiscovery:
+    """Finds a listing page's feeds once per host and fills array properties from them."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config if isinstance(config, dict) else {}
+        self.max_feeds = self.config.get("max_feeds", DEFAULT_MAX_FEEDS)
+        self.max_items = self.config.get("max_items", DEFAULT_MAX_ITEMS)
+        self.max_bytes = self.config.get("max_bytes", DEFAULT_MAX_FEED_BYTES)
+        self.sitemap_pattern = re.compile(self.config["sitemap_pattern"], re.IGNORECASE) if self.config.get("sitemap_pattern") else None
+        self.robots: Dict[str, List[str]] = {}  # host -> sitemaps listed in robots.txt
+
+    def covers(self, schema: Dict[str, Any]) -> bool:
+        """Whether a feed filling its properties leaves nothing for the browser to do."""
+        mappings = feed_properties(schema, self.config)
+        return bool(mappings) and set(schema["properties"]) <= set(mappings) and not any(schema.get(key) for key in RENDER_ONLY_KEYS)
+
+    async def fetch_text(self, http: aiohttp.ClientSession, url: str, limit: int, stop: Optional[bytes] = None) -> Optional[Tuple[str, str]]:
+        """Up to limit bytes of a page (fewer once `stop` shows up), and its final URL."""
+        try:
+            async with http.get(url) as response:
+                if response.status != 200:
+                    return None
+                body = b""
+                async for chunk in response.content.iter_chunked(CHUNK_BYTES):
+                    body += chunk
+                    if len(body) >= limit or (stop and stop in body.lower()):
+                        break
+                return body[:limit].decode(response.charset or "utf-8", errors="replace"), str(response.url)
+        except (aiohttp.ClientError, asyncio.TimeoutError, LookupError) as e:
+            logger.debug(f"Could not fetch {url}: {e}")
+            return None
+
+    async def fetch_feed(self, http: aiohttp.ClientSession, url: str) -> Optional[FeedParser]:
+        """Parse a feed as it downloads, stopping at max_items entries or max_bytes."""
+        parser = FeedParser(self.max_items)
+        try:
+            async with http.get(url) as response:
+                if response.status != 200:
+                    return None
+                read = 0
+                async for chunk in response.content.iter_chunked(CHUNK_BYTES):
+                    read += len(chunk)
+                    if parser.feed(chunk):
+                        return parser  # Enough entries; the rest is never downloaded
+                    if read >= self.max_bytes:
+                        logger.info(f"Stopped reading feed {url} at {read} bytes with {len(parser.entries)} entries")
+                        return parser
+            parser.close()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.info(f"Could not fetch feed {url}: {e}")
+            return None
+        except ET.ParseError as e:
+            logger.info(f"Could not parse feed {url}: {e}")
+            return None
+        return parser
+
+    async def candidates(self, http: aiohttp.ClientSession, url: str) -> List[str]:
+        """Configured feeds, then the page's alternate links, then robots.txt sitemaps."""
+        feeds = [urljoin(url, feed) for feed in self.config.get("urls", [])]
+        if self.config.get("discover", True):
+            # Feed links live in the <head>, so the rest of the page isn't downloaded
+            page = await self.fetch_text(http, url, DEFAULT_MAX_PAGE_BYTES, stop=b"</head>")
+            if page:
+                feeds.extend(alternate_feeds(*page))
+            host = urlparse(url).netloc
+            if host not in self.robots:
+                robots = await self.fetch_text(http, urljoin(url, "/robots.txt"), DEFAULT_MAX_PAGE_BYTES)
+                sitemaps = SITEMAP_LINE.findall(robots[0]) if robots else []
+                self.robots[host] = [s for s in sitemaps if not self.sitemap_pattern or self.sitemap_pattern.search(s)]
+            feeds.extend(self.robots[host])
+        return list(dict.fromkeys(feeds))
+
+    async def read(self, http: aiohttp.ClientSession, url: str, schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Values for the feed-filled properties (plus feed_url) from the first feed covering every requested field, or None."""
+        mappings = feed_properties(schema, self.config)
+        if not mappings:
+            return None
+        queue = await self.candidates(http, url)
+        tried = 0
+        while queue and tried < self.max_feeds:
+            feed_url = queue.pop(0)
+            tried += 1
+            parsed = await self.fetch_feed(http, feed_url)
+            if parsed is None:
+                continue
+            # A sitemap index points at the real sitemaps; try those next
+            queue[:0] = [child for child in parsed.children if not self.sitemap_pattern or self.sitemap_pattern.search(child)]
+            filled = fill_properties(parsed.entries, mappings, schema)
+            if filled is not None:
+                filled["feed_url"] = feed_url
+                return filled
+        return None
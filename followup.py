@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any, Tuple
+from urllib.parse import urljoin
+import aiohttp
+from playwright.async_api import async_playwright, BrowserContext
+from browser_profiles import BROWSER_PROFILES
+from frontier import canonicalize_url
+from sonnet import (
+    ScrapeSession, RunOptions, SCRIPT_VERSION, USER_AGENTS, HTMLParser,
+    create_browser_context, extract_property_offline, scrape_url, empty_result
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FOLLOWUP_CONCURRENCY = 8
+DEFAULT_FETCH_TIMEOUT = 30  # seconds
+DEFAULT_REQUIRED = ["title", "body"]
+
+# Used for hosts no rule matches: Open Graph tags are on nearly every article page
+DEFAULT_STORY_PROPERTIES = {
+    "title": {"type": "string", "selector_type": "css", "selector": "meta[property='og:title']", "attribute": "content"},
+    "image": {"type": "string", "selector_type": "css", "selector": "meta[property='og:image']", "attribute": "content"},
+    "body": {"type": "string", "selector_type": "css", "selector": "article, main", "max_bytes": 20000}
+}
+
+# Listing fields that can stand in for a title the article page didn't yield
+SOURCE_TITLE_FIELDS = ["title", "text", "name"]
+
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """Page records from a run's output: the output.json document or a JSON Lines sink."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f).get("data")
+    if isinstance(data, dict):
+        return [data]
+    return data or []
+
+def parse_field(spec: str) -> Dict[str, str]:
+    """'articles.link' -> {"property": "articles", "field": "link"}; a bare name is a list of URLs."""
+    prop, _, field = spec.partition(".")
+    return {"property": prop, "field": field} if field else {"property": prop}
+
+def collect_links(records: List[Dict[str, Any]], follow: List[Dict[str, str]], pattern: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """Deduplicated links (by canonical URL, first seen wins), each with the listing item it came from."""
+    regex = re.compile(pattern, re.IGNORECASE) if pattern else None
+    seen = set()
+    links = []
+    for record in records:
+        for rule in follow:
+            value = record.get(rule["property"])
+            for item in value if isinstance(value, list) else [value]:
+                link = item.get(rule["field"]) if isinstance(item, dict) and rule.get("field") else item
+                if not isinstance(link, str) or not link.startswith(("http://", "https://")):
+                    continue
+                if regex and not regex.search(link):
+                    continue
+                key = canonicalize_url(link)
+                if key in seen:
+                    continue
+                seen.add(key)
+                links.append((link, item if isinstance(item, dict) else {}))
+    return links
+
+def host_rule(url: str, hosts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The first host rule whose pattern matches the URL, else the Open Graph default."""
+    for rule in hosts:
+        if re.search(rule["pattern"], url, re.IGNORECASE):
+            return rule
+    return {"properties": DEFAULT_STORY_PROPERTIES}
+
+def rule_schema(rule: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "properties": rule["properties"],
+        "actions": rule.get("actions", []),
+        "static": rule.get("static", False)
+    }
+
+def is_complete(data: Dict[str, Any], rule: Dict[str, Any]) -> bool:
+    return all(data.get(key) not in (None, "", []) for key in rule.get("required", DEFAULT_REQUIRED))
+
+class BrowserFallback:
+    """A browser launched on first use, for links plain HTTP can't extract."""
+
+    def __init__(self, options: RunOptions):
+        self.options = options
+        self.playwright = None
+        self.contexts: Dict[bool, Tuple[BrowserContext, Any]] = {}
+        self.sessions: Dict[bool, ScrapeSession] = {}
+        self.pages = 0
+        self._lock = asyncio.Lock()
+
+    async def scrape(self, url: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+        static = bool(schema.get("static"))
+        async with self._lock:
+            if self.playwright is None:
+                self.playwright = await async_playwright().start()
+            if static not in self.contexts:
+                self.contexts[static] = await create_browser_context(self.playwright, static=static, profile_name=self.options.get("browser_profile"))
+                self.sessions[static] = ScrapeSession(schema, self.options)
+        self.pages += 1
+        return await scrape_url(self.sessions[static], self.contexts[static][0], url, schema)
+
+    async def close(self):
+        for session in self.sessions.values():
+            session.close()
+        for context, browser in self.contexts.values():
+            await context.close()
+            await browser.close()
+        if self.playwright is not None:
+            await self.playwright.stop()
+
+async def fetch_static(http: aiohttp.ClientSession, url: str, schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Extract from the server-rendered HTML, or None when the page needs a browser."""
+    try:
+        async with http.get(url) as response:
+            if response.status in (404, 410):
+                return empty_result(schema, f"HTTP {response.status}")
+            if response.status != 200 or "html" not in response.headers.get("Content-Type", ""):
+                return None
+            html = await response.text(errors="replace")
+            base_url = str(response.url)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.debug(f"Plain fetch of {url} failed ({e}); trying the browser")
+        return None
+    tree = HTMLParser(html)
+    return {key: extract_property_offline(tree, base_url, key, value, schema) for key, value in schema["properties"].items()}
+
+def to_story(url: str, data: Dict[str, Any], source: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """A README-format story ({title, image, article}), or None if the page gave no article text."""
+    article = data.get("body")
+    if not isinstance(article, str) or not article.strip():
+        return None
+    title = data.get("title") or next((source[field] for field in SOURCE_TITLE_FIELDS if source.get(field)), None)
+    image = data.get("image")
+    # Meta tag content isn't resolved against the page like src/href are
+    if isinstance(image, str):
+        image = urljoin(url, image)
+    return {"title": title.strip() if isinstance(title, str) else title, "image": image, "article": article.strip()}
+
+async def run_followup(config: Dict[str, Any], records: List[Dict[str, Any]], options: RunOptions) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Fetch every linked page once, over pooled HTTP where possible, and build stories from them."""
+    links = collect_links(records, config["follow"], config.get("pattern"))
+    if config.get("max_links"):
+        links = links[:config["max_links"]]
+    hosts = config.get("hosts", [])
+    concurrency = config.get("concurrency", DEFAULT_FOLLOWUP_CONCURRENCY)
+    if HTMLParser is None:
+        logger.warning("selectolax is not installed; every follow-up link goes through the browser")
+
+    counts = {"links": len(links), "http": 0, "browser": 0, "failed": 0}
+    results: List[Optional[Dict[str, Any]]] = [None] * len(links)
+    semaphore = asyncio.Semaphore(concurrency)
+    browser = BrowserFallback(options)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=config.get("per_host", concurrency), ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=config.get("timeout", DEFAULT_FETCH_TIMEOUT))
+
+    async def follow(index: int, url: str):
+        rule = host_rule(url, hosts)
+        schema = rule_schema(rule)
+        async with semaphore:
+            try:
+                data = None
+                if HTMLParser is not None and not rule.get("browser"):
+                    data = await fetch_static(http, url, schema)
+                    if data is not None and not data.get("error") and not is_complete(data, rule):
+                        data = None  # Rendered client-side, or the static markup differs
+                if data is None:
+                    data = await browser.scrape(url, schema)
+                    counts["browser"] += 1
+                else:
+                    counts["http"] += 1
+            except Exception as e:
+                logger.error(f"Follow-up of {url} failed: {str(e)}")
+                data = empty_result(schema, str(e))
+        if data.get("error"):
+            counts["failed"] += 1
+        results[index] = data
+
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers={"User-Agent": random.choice(USER_AGENTS)}) as http:
+            await asyncio.gather(*(follow(index, url) for index, (url, _) in enumerate(links)))
+    finally:
+        await browser.close()
+
+    stories = [story for story in (to_story(url, data, source) for data, (url, source) in zip(results, links)) if story]
+    counts["stories"] = len(stories)
+    return stories, counts
+
+def followup_config(schema: Dict[str, Any], fields: List[str], pattern: Optional[str]) -> Dict[str, Any]:
+    """The schema's followup section, with --field/--pattern taking precedence."""
+    config = dict(schema.get("followup") or {})
+    if fields:
+        config["follow"] = [parse_field(field) for field in fields]
+    if pattern:
+        config["pattern"] = pattern
+    if not config.get("follow"):
+        raise ValueError("Nothing to follow: give --field or a followup.follow section in the schema")
+    return config
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch the articles a run linked to and build {title, image, article} stories")
+    parser.add_argument("--input", default="output.json", help="Results of the listing run (output.json or a .jsonl sink)")
+    parser.add_argument("--schema", help="Schema whose followup section says what to follow and how to extract it")
+    parser.add_argument("--field", action="append", default=[], help="Link field to follow, e.g. articles.link (repeatable; overrides the schema)")
+    parser.add_argument("--pattern", help="Only follow links matching this regex")
+    parser.add_argument("--output", default="stories.json", help="Where to write the stories")
+    parser.add_argument("--profile", choices=list(BROWSER_PROFILES), help="Browser profile for links that need the browser")
+    return parser.parse_args()
+
+async def main():
+    args = parse_args()
+    schema = {}
+    if args.schema:
+        with open(args.schema, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+    config = followup_config(schema, args.field, args.pattern)
+    records = load_records(args.input)
+
+    start_time = datetime.now(timezone.utc)
+    stories, counts = await run_followup(config, records, {"browser_profile": args.profile})
+    duration = (datetime.now(timezone.utc) - start_time).total_seconds()
+    logger.info(
+        f"Followed {counts['links']} links in {duration:.2f} seconds: {counts['http']} over HTTP, "
+        f"{counts['browser']} in the browser, {counts['failed']} failed; {counts['stories']} stories"
+    )
+
+    with open(args.output, "w", encoding="utf-8") as outfile:
+        json.dump({
+            "metadata": {
+                "timestamp": start_time.strftime('%Y-%m-%d %H:%M:%S'),
+                "version": SCRIPT_VERSION,
+                "source": args.input,
+                "counts": counts
+            },
+            "stories": stories
+        }, outfile, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    asyncio.run(main())
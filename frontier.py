@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import heapq
+import math
+import re
+from typing import Dict, List, Optional, Any, Tuple, NamedTuple
+from urllib.parse import urlsplit, urlunsplit, urldefrag, parse_qsl, urlencode
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|_ga|CMP)$', re.IGNORECASE)
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def canonicalize_url(url: str) -> str:
+    """Normalise a URL so trivially different spellings of the same page compare equal."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = re.sub(r'/{2,}', '/', parts.path) or "/"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAMS.match(k)))
+    # Fragments never change what the server sends
+    return urlunsplit((scheme, host, path, query, ""))
+
+class BloomFilter:
+    """Fixed-size probabilistic set: no false negatives, a tunable rate of false positives."""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class FrontierEntry(NamedTuple):
+    priority: float
+    sequence: int
+    url: str
+    depth: int
+
+class Frontier:
+    """Prioritised queue of URLs to visit, with dedup, depth/budget limits and per-host politeness."""
+
+    def __init__(self, max_depth: int = 0, max_pages: Optional[int] = None, delay: float = 0.0, seen_capacity: int = 100000):
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.delay = delay
+        self.seen = BloomFilter(seen_capacity)
+        self.heap: List[FrontierEntry] = []
+        self.next_allowed: Dict[str, float] = {}
+        self.accepted = 0
+        self.in_progress = 0
+        self._changed = asyncio.Event()
+
+    def push(self, url: str, depth: int = 0, priority: Optional[float] = None) -> bool:
+        """Queue a URL unless it was seen before or falls outside the depth/page budget."""
+        if depth > self.max_depth or (self.max_pages is not None and self.accepted >= self.max_pages):
+            return False
+        canonical = canonicalize_url(url)
+        if canonical in self.seen:
+            return False
+        self.seen.add(canonical)
+        entry = FrontierEntry(depth if priority is None else priority, self.accepted, urldefrag(url)[0], depth)
+        heapq.heappush(self.heap, entry)
+        self.accepted += 1
+        self._changed.set()
+        return True
+
+    def _pop_ready(self, now: float) -> Tuple[Optional[FrontierEntry], Optional[float]]:
+        """Best entry whose host may be visited now, else how long until one may."""
+        deferred = []
+        entry, wait = None, None
+        while self.heap:
+            candidate = heapq.heappop(self.heap)
+            ready_at = self.next_allowed.get(urlsplit(candidate.url).netloc, 0.0)
+            if ready_at <= now:
+                entry = candidate
+                break
+            deferred.append(candidate)
+            wait = ready_at - now if wait is None else min(wait, ready_at - now)
+        for candidate in deferred:
+            heapq.heappush(self.heap, candidate)
+        return entry, wait
+
+    async def get(self) -> Optional[FrontierEntry]:
+        """Wait for the next URL to visit; None once the frontier is drained and no page can add more."""
+        loop = asyncio.get_running_loop()
+        while True:
+            wait = None
+            if self.heap:
+                now = loop.time()
+                entry, wait = self._pop_ready(now)
+                if entry:
+                    self.next_allowed[urlsplit(entry.url).netloc] = now + self.delay
+                    self.in_progress += 1
+                    return entry
+            elif self.in_progress == 0:
+                return None
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def task_done(self):
+        self.in_progress -= 1
+        self._changed.set()
+
+def follow_links(data: Dict[str, Any], crawl: Dict[str, Any]) -> List[str]:
+    """Pull candidate links out of a page's extracted data according to the crawl's follow rules."""
+    pattern = re.compile(crawl["pattern"], re.IGNORECASE) if crawl.get("pattern") else None
+    links = []
+    for rule in crawl.get("follow", []):
+        value = data.get(rule["property"])
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            link = item.get(rule["field"]) if isinstance(item, dict) and rule.get("field") else item
+            if isinstance(link, str) and link.startswith(("http://", "https://")) and (not pattern or pattern.search(link)):
+                links.append(link)
+    return links
+
+def link_priority(url: str, depth: int, crawl: Dict[str, Any]) -> float:
+    """Lower is visited sooner: the first matching priority rule, else the link's depth."""
+    for rule in crawl.get("priorities", []):
+        if re.search(rule["pattern"], url, re.IGNORECASE):
+            return rule["priority"]
+    return depth
@@ -1,4 +1,5 @@
 import nest_asyncio
+import argparse
 import json
 import random
 import asyncio
@@ -7,6 +8,9 @@ from datetime import datetime, timezone
 from typing import Dict, List, Optional, Union, Any, TypedDict
 from playwright.async_api import async_playwright, Page, BrowserContext
 from urllib.parse import urljoin
+from browser_profiles import get_profile, launch_args, profile_name_from_env, DEFAULT_PROFILE
+from result_cache import open_result_cache, cache_max_age, schema_cache_id
+from output_backends import publish_json
 
 SCRIPT_VERSION = "2.4.0"
 CURRENT_USER = "saqoah"
@@ -46,6 +50,11 @@ class ScrapingSchema(TypedDict):
     properties: Dict[str, PropertyConfig]
     actions: Optional[List[ActionConfig]]
     post_actions: Optional[Dict[str, PostActionConfig]]
+    extraction_deadline: Optional[float]
+
+# Seconds all properties on the page share for waiting on selectors, plus grace for reading elements
+PAGE_EXTRACTION_DEADLINE = 10
+EXTRACTION_GRACE_PERIOD = 5
 
 # Expanded modern user agent list
 USER_AGENTS = [
@@ -59,13 +68,8 @@ USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.2478.88"
 ]
 
-# Enhanced browser arguments to avoid detection
+# Enhanced browser arguments to avoid detection, on top of the browser profile's
 BROWSER_ARGS = [
-    '--disable-dev-shm-usage',
-    '--no-sandbox',
-    '--disable-gpu',
-    '--disable-software-rasterizer',
-    '--disable-extensions',
     '--disable-blink-features=AutomationControlled',
     '--disable-web-security',
     '--disable-features=IsolateOrigins,site-per-process',
@@ -87,13 +91,21 @@ BROWSER_ARGS = [
     '--no-first-run'
 ]
 
-async def create_browser_context(playwright):
-    browser = await playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+async def create_browser_context(playwright, profile_name: Optional[str] = None):
+    profile_name = profile_name or profile_name_from_env()
+    profile = get_profile(profile_name)
+    browser = await playwright.chromium.launch(headless=True, args=launch_args(profile, BROWSER_ARGS))
+    
+    # A randomised window size looks less automated; tuned profiles keep their own
+    if profile_name == DEFAULT_PROFILE:
+        viewport = {'width': random.randint(1300, 1920), 'height': random.randint(800, 1080)}
+    else:
+        viewport = profile["viewport"]
     
     # Create context with extended options
     context = await browser.new_context(
         user_agent=random.choice(USER_AGENTS),
-        viewport={'width': random.randint(1300, 1920), 'height': random.randint(800, 1080)},
+        viewport=viewport,
         ignore_https_errors=True,
         locale='en-US,en;q=0.9',
         timezone_id='America/New_York',
@@ -257,20 +269,30 @@ def extract_network_requests(requests: List[Dict[str, str]], config: PostActionC
     for req in requests:
         if req["method"] in methods and pattern.search(req["url"]):
             results.append(req["url"])
-    return list(set(results)) if results else None
+    return list(dict.fromkeys(results)) if results else None
 
 async def extract_data(page: Page, schema: ScrapingSchema):
     data = {key: None for key in schema["properties"]}
-    for key, value in schema["properties"].items():
-        try:
-            data[key] = await extract_property(page, key, value)
-            # Add small random delays between property extractions
-            await asyncio.sleep(random.uniform(0.2, 0.7))
-        except Exception:
-            data[key] = None
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + schema.get("extraction_deadline", PAGE_EXTRACTION_DEADLINE)
+    
+    # Extract all properties concurrently so missing selectors time out together
+    tasks = {
+        key: asyncio.ensure_future(extract_property(page, key, value, deadline))
+        for key, value in schema["properties"].items()
+    }
+    if not tasks:
+        return data
+    done, pending = await asyncio.wait(tasks.values(), timeout=max(0, deadline - loop.time()) + EXTRACTION_GRACE_PERIOD)
+    for task in pending:
+        task.cancel()
+    
+    for key, task in tasks.items():
+        if task in done and not task.exception():
+            data[key] = task.result()
     return data
 
-async def extract_property(page: Page, key: str, value: PropertyConfig):
+async def extract_property(page: Page, key: str, value: PropertyConfig, deadline: Optional[float] = None):
     try:
         if value["type"] == "regex":
             pattern = value.get("pattern")
@@ -284,15 +306,17 @@ async def extract_property(page: Page, key: str, value: PropertyConfig):
                 matches = regex.findall(text)
                 if matches:
                     results.extend(matches)
-            return list(set(results))
+            return list(dict.fromkeys(results))
         
         selector_type = value.get("selector_type", "css")
         selector = value["selector"]
         
         # More fault-tolerant selector handling
         if selector_type == "css":
+            timeout = PAGE_EXTRACTION_DEADLINE if deadline is None else deadline - asyncio.get_running_loop().time()
             try:
-                await page.wait_for_selector(selector, state="attached", timeout=10000)
+                if timeout > 0:
+                    await page.wait_for_selector(selector, state="attached", timeout=timeout * 1000)
             except Exception:
                 pass  # Continue anyway, might be available without waiting
             elements = await page.query_selector_all(selector)
@@ -443,34 +467,49 @@ async def extract_post_action(page: Page, config: PostActionConfig):
                     if value:
                         results.append(urljoin(page.url, value))
                         
-            return list(set(results)) if results else None
+            return list(dict.fromkeys(results)) if results else None
     except Exception:
         return None
         
     return None
 
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-age", type=float, help="Reuse a cached result up to this many seconds old (overrides the schema's cache ttl; 0 forces a refresh)")
+    return parser.parse_args()
+
 async def main():
+    args = parse_args()
     try:
         with open("schema.json", "r", encoding="utf-8") as f:
             schema = json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
         return
-        
+    
+    cache = open_result_cache(schema, max_age=args.max_age)
     try:
-        data = await scrape_website(schema)
+        url = schema.get("url", "https://www.google.com/")
+        data = cache.get(url, schema_cache_id(schema), cache_max_age(schema, args.max_age)) if cache else None
+        if data is None:
+            data = await scrape_website(schema)
+            if cache and any(value is not None for value in data.values()):
+                cache.put(url, schema_cache_id(schema), data)
+        
+        metadata = {
+            "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            "version": SCRIPT_VERSION,
+            "url": schema.get("url")
+        }
+        if cache:
+            metadata["metrics"] = {"cache": cache.stats()}
         
-        output_file = "output.json"
-        with open(output_file, "w", encoding="utf-8") as outfile:
-            json.dump({
-                "metadata": {
-                    "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
-                    "version": SCRIPT_VERSION,
-                    "url": schema.get("url")
-                },
-                "data": data
-            }, outfile, indent=2, ensure_ascii=False)
+        # Only rewritten when the data changed, so the scheduled workflow commits real changes only
+        publish_json("output.json", data, metadata)
     except Exception:
         pass
+    finally:
+        if cache:
+            cache.close()
 
 if __name__ == "__main__":
     nest_asyncio.apply()
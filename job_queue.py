@@ -0,0 +1,186 @@
+import abc
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from typing import Dict, Optional, Any, Iterable, NamedTuple
+
+DEFAULT_QUEUE_FILE = "jobs.db"
+DEFAULT_VISIBILITY_TIMEOUT = 300.0  # seconds a leased job stays invisible to other workers
+DEFAULT_MAX_ATTEMPTS = 3
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+class Job(NamedTuple):
+    id: int
+    schema_id: str
+    schema: Dict[str, Any]
+    url: str
+    attempts: int
+    lease_token: str
+
+def schema_fingerprint(schema: Dict[str, Any]) -> str:
+    """Stable id for a schema, so jobs can share one stored copy."""
+    return hashlib.sha1(json.dumps(schema, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+class JobQueue(abc.ABC):
+    """Queue of (schema, URL) jobs with leases.
+
+    A leased job is hidden from other workers until it is acked, or until its
+    visibility timeout passes without a heartbeat, at which point it is handed out
+    again. Delivery is therefore at-least-once. Any backend offering these methods
+    (e.g. a Redis list plus a sorted set of lease deadlines) can stand in for SQLite.
+    """
+
+    max_attempts = DEFAULT_MAX_ATTEMPTS
+
+    @abc.abstractmethod
+    def enqueue(self, schema: Dict[str, Any], urls: Iterable[str]) -> int:
+        ...
+
+    @abc.abstractmethod
+    def lease(self, worker: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> Optional[Job]:
+        ...
+
+    @abc.abstractmethod
+    def extend(self, job: Job, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def ack(self, job: Job) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def fail(self, job: Job, error: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def stats(self) -> Dict[str, int]:
+        ...
+
+    def close(self):
+        pass
+
+class SqliteJobQueue(JobQueue):
+    """JobQueue in a SQLite file; workers on several machines need it on a shared disk."""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_FILE, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.schemas: Dict[str, Dict[str, Any]] = {}
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS schemas (
+                id TEXT PRIMARY KEY,
+                body TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                schema_id TEXT NOT NULL REFERENCES schemas(id),
+                url TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_token TEXT,
+                lease_expires REAL,
+                error TEXT,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires);
+        """)
+
+    def enqueue(self, schema: Dict[str, Any], urls: Iterable[str]) -> int:
+        schema_id = schema_fingerprint(schema)
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.db.execute("INSERT OR IGNORE INTO schemas (id, body) VALUES (?, ?)", (schema_id, json.dumps(schema)))
+            cursor = self.db.executemany(
+                "INSERT INTO jobs (schema_id, url, updated) VALUES (?, ?, ?)",
+                ((schema_id, url, now) for url in urls)
+            )
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    def _schema(self, schema_id: str) -> Dict[str, Any]:
+        if schema_id not in self.schemas:
+            row = self.db.execute("SELECT body FROM schemas WHERE id = ?", (schema_id,)).fetchone()
+            self.schemas[schema_id] = json.loads(row[0])
+        return self.schemas[schema_id]
+
+    def lease(self, worker: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> Optional[Job]:
+        now = time.time()
+        token = uuid.uuid4().hex
+        # IMMEDIATE takes the write lock up front, so two workers can never lease the same row
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            # Jobs whose lease ran out were abandoned by a crashed worker; retire the ones out of attempts
+            self.db.execute(
+                "UPDATE jobs SET state = ?, error = 'lease expired too many times', updated = ? "
+                "WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, now, LEASED, now, self.max_attempts)
+            )
+            row = self.db.execute(
+                "SELECT id, schema_id, url, attempts FROM jobs "
+                "WHERE state = ? OR (state = ? AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (PENDING, LEASED, now)
+            ).fetchone()
+            if row:
+                self.db.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, lease_owner = ?, lease_token = ?, lease_expires = ?, updated = ? WHERE id = ?",
+                    (LEASED, worker, token, now + visibility_timeout, now, row[0])
+                )
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        if not row:
+            return None
+        job_id, schema_id, url, attempts = row
+        return Job(job_id, schema_id, self._schema(schema_id), url, attempts + 1, token)
+
+    def _update_leased(self, job: Job, sql: str, params: tuple) -> bool:
+        # The token check stops a worker whose lease expired from touching a job someone else now holds
+        cursor = self.db.execute(f"{sql} WHERE id = ? AND state = ? AND lease_token = ?", params + (job.id, LEASED, job.lease_token))
+        return cursor.rowcount == 1
+
+    def extend(self, job: Job, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> bool:
+        now = time.time()
+        return self._update_leased(job, "UPDATE jobs SET lease_expires = ?, updated = ?", (now + visibility_timeout, now))
+
+    def ack(self, job: Job) -> bool:
+        return self._update_leased(job, "UPDATE jobs SET state = ?, updated = ?", (DONE, time.time()))
+
+    def fail(self, job: Job, error: str) -> bool:
+        """Give up on this attempt: retry later unless the job is out of attempts."""
+        state = FAILED if job.attempts >= self.max_attempts else PENDING
+        return self._update_leased(job, "UPDATE jobs SET state = ?, error = ?, updated = ?", (state, error, time.time()))
+
+    def stats(self) -> Dict[str, int]:
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(self.db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()))
+        return counts
+
+    def close(self):
+        self.db.close()
+
+def open_job_queue(location: str, **kwargs) -> JobQueue:
+    """Open a queue by location; only SQLite files (optionally written sqlite:///path) exist so far."""
+    if location.startswith("sqlite:///"):
+        location = location[len("sqlite:///"):]
+    elif "://" in location:
+        raise ValueError(f"Unsupported job queue: {location}")
+    return SqliteJobQueue(location, **kwargs)
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
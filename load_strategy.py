@@ -0,0 +1,223 @@
+import asyncio
+import json
+import os
+import re
+import statistics
+from typing import Dict, List, Optional, Any, TypedDict, Union, Set
+from urllib.parse import urlparse
+from playwright.async_api import Page, Request
+
+LOAD_STATS_FILE = "load_stats.json"
+DEFAULT_LOAD_TIMEOUT = 30  # seconds
+DEFAULT_QUIET_MS = 500
+MAX_TIMINGS_PER_STRATEGY = 20
+
+# Traffic that never settles on streaming/ad-heavy pages and should not hold up "network quiet"
+IGNORED_RESOURCE_TYPES = {"media", "websocket", "eventsource", "ping", "beacon"}
+IGNORED_HOSTS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "scorecardresearch.com",
+    "hotjar.com"
+]
+
+class LoadStrategyConfig(TypedDict, total=False):
+    type: str  # "networkidle", "domcontentloaded", "selectors", "network_quiet", "request" or "auto"
+    required_selectors: List[str]
+    quiet_ms: int
+    ignore_hosts: List[str]
+    request_pattern: str
+    candidates: List[str]
+    timeout: float
+    required_properties: List[str]  # what a page must yield for the strategy to count as having worked
+
+def normalize_load_config(config: Union[str, Dict[str, Any], None], default: str) -> LoadStrategyConfig:
+    """Accept the schema's load_strategy as a bare name or a full config."""
+    if config is None:
+        return {"type": default}
+    if isinstance(config, str):
+        return {"type": config}
+    return {"type": default, **config}
+
+def candidate_strategies(config: LoadStrategyConfig) -> List[str]:
+    """Strategies "auto" may pick from, roughly cheapest first."""
+    if config.get("candidates"):
+        return list(config["candidates"])
+    candidates = []
+    if config.get("required_selectors"):
+        candidates.append("selectors")
+    if config.get("request_pattern"):
+        candidates.append("request")
+    if not candidates:
+        candidates.append("domcontentloaded")
+    return candidates + ["network_quiet", "networkidle"]
+
+def has_value(value: Any) -> bool:
+    return value not in (None, [], "")
+
+def load_succeeded(data: Dict[str, Any], schema: Dict[str, Any], config: LoadStrategyConfig) -> bool:
+    """Whether a page loaded with some strategy yielded what the schema is after.
+
+    That is the config's required_properties when given; otherwise the page's media
+    when the schema captures media (a fast strategy that returns before the player
+    starts finds the text but not the stream); otherwise any property at all.
+    """
+    if config.get("required_properties"):
+        return all(has_value(data.get(key)) for key in config["required_properties"])
+    media_keys = [key for key, action in (schema.get("post_actions") or {}).items() if action.get("type") == "network" and action.get("media_only")]
+    if schema.get("enable_media_capture"):
+        media_keys.append("media_urls")
+    if media_keys:
+        return any(has_value(data.get(key)) for key in media_keys)
+    return any(has_value(data.get(key)) for key in schema["properties"])
+
+class NetworkQuietTracker:
+    """Tracks in-flight requests, ignoring media streams, beacons and analytics hosts."""
+
+    def __init__(self, ignore_hosts: List[str]):
+        self.ignore_hosts = ignore_hosts
+        self.in_flight: Set[Request] = set()
+        self.last_activity = asyncio.get_running_loop().time()
+
+    def is_ignored(self, request: Request) -> bool:
+        if request.resource_type in IGNORED_RESOURCE_TYPES:
+            return True
+        host = urlparse(request.url).hostname or ""
+        return any(host == ignored or host.endswith("." + ignored) for ignored in self.ignore_hosts)
+
+    def on_request(self, request: Request):
+        if not self.is_ignored(request):
+            self.in_flight.add(request)
+            self.last_activity = asyncio.get_running_loop().time()
+
+    def on_done(self, request: Request):
+        if request in self.in_flight:
+            self.in_flight.discard(request)
+            self.last_activity = asyncio.get_running_loop().time()
+
+    def attach(self, page: Page):
+        page.on("request", self.on_request)
+        page.on("requestfinished", self.on_done)
+        page.on("requestfailed", self.on_done)
+
+    def detach(self, page: Page):
+        page.remove_listener("request", self.on_request)
+        page.remove_listener("requestfinished", self.on_done)
+        page.remove_listener("requestfailed", self.on_done)
+
+    async def wait_quiet(self, quiet_ms: int, timeout: float):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        quiet = quiet_ms / 1000
+        while True:
+            now = loop.time()
+            if not self.in_flight and now - self.last_activity >= quiet:
+                return
+            if now >= deadline:
+                raise asyncio.TimeoutError(f"Network not quiet after {timeout:.1f}s ({len(self.in_flight)} requests in flight)")
+            await asyncio.sleep(min(0.05, deadline - now))
+
+async def load_page(page: Page, url: str, strategy: str, config: LoadStrategyConfig):
+    """Navigate to a URL and wait until the page is ready according to the given strategy."""
+    loop = asyncio.get_running_loop()
+    timeout = config.get("timeout", DEFAULT_LOAD_TIMEOUT)
+    deadline = loop.time() + timeout
+
+    def remaining() -> float:
+        return max(0.001, deadline - loop.time())
+
+    if strategy in ("networkidle", "domcontentloaded", "load", "commit"):
+        return await page.goto(url, wait_until=strategy, timeout=timeout * 1000)
+
+    if strategy == "selectors":
+        # DOMContentLoaded plus every required selector attached
+        response = await page.goto(url, wait_until="domcontentloaded", timeout=timeout * 1000)
+        selectors = config.get("required_selectors", [])
+        if selectors:
+            await asyncio.gather(*(
+                page.wait_for_selector(selector, state="attached", timeout=remaining() * 1000)
+                for selector in selectors
+            ))
+        return response
+
+    if strategy == "request":
+        # DOMContentLoaded plus a specific request (e.g. the player's manifest) having been sent
+        pattern = re.compile(config["request_pattern"], re.IGNORECASE)
+        seen = asyncio.Event()
+
+        def on_request(request: Request):
+            if pattern.search(request.url):
+                seen.set()
+
+        page.on("request", on_request)
+        try:
+            response = await page.goto(url, wait_until="domcontentloaded", timeout=timeout * 1000)
+            await asyncio.wait_for(seen.wait(), remaining())
+            return response
+        finally:
+            page.remove_listener("request", on_request)
+
+    if strategy == "network_quiet":
+        tracker = NetworkQuietTracker(config.get("ignore_hosts", IGNORED_HOSTS))
+        tracker.attach(page)
+        try:
+            response = await page.goto(url, wait_until="domcontentloaded", timeout=timeout * 1000)
+            await tracker.wait_quiet(config.get("quiet_ms", DEFAULT_QUIET_MS), remaining())
+            return response
+        finally:
+            tracker.detach(page)
+
+    raise ValueError(f"Unknown load strategy: {strategy}")
+
+class LoadStats:
+    """Per-host load timings and outcomes, persisted between runs."""
+
+    def __init__(self, path: str = LOAD_STATS_FILE):
+        self.path = path
+        self.hosts: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.hosts = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self.hosts = {}
+
+    def entry(self, host: str, strategy: str) -> Dict[str, Any]:
+        return self.hosts.setdefault(host, {}).setdefault(strategy, {"timings": [], "successes": 0, "failures": 0})
+
+    def record(self, host: str, strategy: str, elapsed: Optional[float], ok: bool):
+        entry = self.entry(host, strategy)
+        if ok:
+            entry["successes"] += 1
+            entry["timings"] = (entry["timings"] + [round(elapsed, 3)])[-MAX_TIMINGS_PER_STRATEGY:]
+        else:
+            entry["failures"] += 1
+
+    def median(self, host: str, strategy: str) -> Optional[float]:
+        timings = self.hosts.get(host, {}).get(strategy, {}).get("timings")
+        return statistics.median(timings) if timings else None
+
+    def choose(self, host: str, candidates: List[str], exclude: Optional[List[str]] = None) -> str:
+        """Pick the strategy with the lowest median load time that has mostly worked on this host."""
+        options = [c for c in candidates if c not in (exclude or [])] or candidates[-1:]
+        best = None
+        for strategy in options:
+            entry = self.hosts.get(host, {}).get(strategy)
+            if entry and entry["successes"] and entry["successes"] >= entry["failures"]:
+                timing = statistics.median(entry["timings"])
+                if best is None or timing < best[0]:
+                    best = (timing, strategy)
+        if best:
+            return best[1]
+        # Nothing has worked yet: walk the candidates in order, skipping ones known to fail
+        untried = [s for s in options if not self.hosts.get(host, {}).get(s, {}).get("failures")]
+        return (untried or options)[0]
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.hosts, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
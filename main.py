@@ -18,6 +18,9 @@ import re
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Union, Any, TypedDict, Pattern
 from playwright.async_api import async_playwright, Page, ElementHandle, Locator, Browser, BrowserContext
+from urllib.parse import urlparse
+from load_strategy import LoadStats, normalize_load_config, candidate_strategies, load_page, load_succeeded
+from browser_profiles import get_profile, launch_args
 
 # Configure logging with UTC timestamp
 logging.basicConfig(
@@ -60,6 +63,7 @@ class ScrapingSchema(TypedDict):
     url: str
     properties: Dict[str, PropertyConfig]
     actions: Optional[List[ActionConfig]]
+    load_strategy: Optional[Union[str, Dict[str, Any]]]
 
 # Configuration
 USER_AGENTS = [
@@ -69,24 +73,17 @@ USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15"
 ]
 
-BROWSER_ARGS = [
-    '--disable-dev-shm-usage',
-    '--no-sandbox',
-    '--disable-gpu',
-    '--disable-software-rasterizer',
-    '--disable-extensions'
-]
-
-async def create_browser_context(playwright) -> BrowserContext:
-    """Creates and configures a browser context with optimal settings."""
+async def create_browser_context(playwright, profile_name: Optional[str] = None) -> BrowserContext:
+    """Creates and configures a browser context from a browser profile (default: $BROWSER_PROFILE)."""
+    profile = get_profile(profile_name)
     browser = await playwright.chromium.launch(
         headless=True,
-        args=BROWSER_ARGS
+        args=launch_args(profile)
     )
     
     context = await browser.new_context(
         user_agent=random.choice(USER_AGENTS),
-        viewport={'width': 1920, 'height': 1080},
+        viewport=profile["viewport"],
         ignore_https_errors=True
     )
     
@@ -108,6 +105,16 @@ async def scrape_website(schema: ScrapingSchema) -> Optional[Dict[str, Any]]:
     logger.info(f"Starting scraping job for {url} at {start_time.strftime('%Y-%m-%d %H:%M:%S')} UTC")
     logger.info(f"Script version: {SCRIPT_VERSION}, User: {CURRENT_USER}")
     
+    # Wait for networkidle unless the schema picks (or asks to learn) a cheaper load strategy
+    load_config = normalize_load_config(schema.get("load_strategy"), default="networkidle")
+    load_config.setdefault("timeout", 30)
+    load_stats = LoadStats()
+    host = urlparse(url).netloc
+    if load_config["type"] == "auto":
+        strategy = load_stats.choose(host, candidate_strategies(load_config))
+    else:
+        strategy = load_config["type"]
+    
     async with async_playwright() as p:
         context = await create_browser_context(p)
         page = await context.new_page()
@@ -119,13 +126,24 @@ async def scrape_website(schema: ScrapingSchema) -> Optional[Dict[str, Any]]:
 
             # Set default timeout and navigate
             page.set_default_timeout(30000)
-            response = await page.goto(url, wait_until='networkidle')
+            load_start = datetime.now(timezone.utc)
+            try:
+                response = await load_page(page, url, strategy, load_config)
+            except Exception:
+                load_stats.record(host, strategy, None, False)
+                raise
+            load_elapsed = (datetime.now(timezone.utc) - load_start).total_seconds()
+            logger.info(f"Page loaded with '{strategy}' strategy in {load_elapsed:.2f} seconds")
             
             if not response or not response.ok:
+                load_stats.record(host, strategy, None, False)
                 raise ScrapingError(f"Failed to load page: {response.status if response else 'No response'}")
 
             data = await extract_data(page, schema)
             
+            # The strategy only counts as having worked if the page yielded what the schema is after
+            load_stats.record(host, strategy, load_elapsed, load_succeeded(data, schema, load_config))
+            
             # Record completion time and duration
             end_time = datetime.now(timezone.utc)
             duration = (end_time - start_time).total_seconds()
@@ -137,6 +155,7 @@ async def scrape_website(schema: ScrapingSchema) -> Optional[Dict[str, Any]]:
             logger.error(f"Error during scraping: {str(e)}", exc_info=True)
             return None
         finally:
+            load_stats.save()
             await context.close()
 
 async def extract_data(page: Page, schema: ScrapingSchema) -> Dict[str, Any]:
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import re
+from typing import Dict, List, Optional, Any
+from playwright.async_api import Page
+
+MUTATION_BINDING = "__scraperMutation"
+DEFAULT_ATTRIBUTES = ["src", "href", "data-src"]
+DEFAULT_QUIET_MS = 500
+DEFAULT_SETTLE_TIMEOUT = 2.0  # matches the fixed sleep that used to follow every action
+
+# Installed as an init script in every frame: reports URL-like attributes of elements that are
+# added or changed, batched per macrotask, to the Python binding
+MUTATION_OBSERVER_JS = """
+(() => {
+    if (window.__scraperObserverInstalled) return;
+    window.__scraperObserverInstalled = true;
+    const ATTRIBUTES = %s;
+    const SELECTOR = ATTRIBUTES.map(a => '[' + a + ']').join(',');
+    let pending = [];
+    let scheduled = false;
+
+    const flush = () => {
+        scheduled = false;
+        const batch = pending;
+        pending = [];
+        if (batch.length && window.%s) window.%s(batch);
+    };
+    const report = (element, attribute) => {
+        let value = element.getAttribute(attribute);
+        if (!value) return;
+        try { value = new URL(value, document.baseURI).href; } catch (e) {}
+        pending.push([element.tagName.toLowerCase(), attribute, value]);
+        if (!scheduled) {
+            scheduled = true;
+            setTimeout(flush, 0);
+        }
+    };
+    const scan = (node) => {
+        if (node.nodeType !== 1) return;
+        for (const attribute of ATTRIBUTES) if (node.hasAttribute(attribute)) report(node, attribute);
+        node.querySelectorAll(SELECTOR).forEach(child => {
+            for (const attribute of ATTRIBUTES) if (child.hasAttribute(attribute)) report(child, attribute);
+        });
+    };
+
+    const observer = new MutationObserver(mutations => {
+        for (const mutation of mutations) {
+            if (mutation.type === 'attributes') report(mutation.target, mutation.attributeName);
+            else mutation.addedNodes.forEach(scan);
+        }
+    });
+    observer.observe(document, {childList: true, subtree: true, attributes: true, attributeFilter: ATTRIBUTES});
+})();
+"""
+
+class MutationCapture:
+    """Collects src/href/data-src values streamed from an in-page MutationObserver."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.attributes = config.get("attributes", DEFAULT_ATTRIBUTES)
+        self.pattern = re.compile(config["pattern"], re.IGNORECASE) if config.get("pattern") else None
+        self.stop_on_match = config.get("stop_on_match", False)
+        self.quiet_ms = config.get("quiet_ms", DEFAULT_QUIET_MS)
+        self.timeout = config.get("timeout", DEFAULT_SETTLE_TIMEOUT)
+        self.values: Dict[str, None] = {}  # insertion-ordered set
+        self.matched = asyncio.Event()
+        self.last_activity = asyncio.get_running_loop().time()
+
+    async def install(self, page: Page):
+        """Expose the binding and register the observer; must run before the page navigates."""
+        await page.expose_binding(MUTATION_BINDING, self.on_batch)
+        await page.add_init_script(MUTATION_OBSERVER_JS % (json.dumps(self.attributes), MUTATION_BINDING, MUTATION_BINDING))
+
+    def on_batch(self, source, batch: List[List[str]]):
+        self.last_activity = asyncio.get_running_loop().time()
+        for tag, attribute, value in batch:
+            if value in self.values:
+                continue
+            self.values[value] = None
+            if self.pattern and self.pattern.search(value):
+                self.matched.set()
+
+    def stop_event(self) -> Optional[asyncio.Event]:
+        """Event that ends waits early once a matching value has been seen."""
+        return self.matched if self.stop_on_match else None
+
+    async def settle(self, wait_scale: float = 1.0):
+        """Wait until the DOM stops producing new URLs (or a match arrives), at most the timeout."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + self.timeout * wait_scale
+        quiet = self.quiet_ms / 1000 * wait_scale
+        # Give the page at least one quiet period to react to whatever just happened
+        self.last_activity = max(self.last_activity, start)
+        while loop.time() < deadline:
+            if self.stop_on_match and self.matched.is_set():
+                return
+            if loop.time() - self.last_activity >= quiet:
+                return
+            await asyncio.sleep(0.05)
+
+    def captured(self, pattern: Optional[str] = None) -> List[str]:
+        """Captured values in arrival order, filtered by a pattern (default: the capture's own)."""
+        regex = re.compile(pattern, re.IGNORECASE) if pattern else self.pattern
+        return [value for value in self.values if not regex or regex.search(value)]
@@ -0,0 +1,370 @@
+import json
+import os
+import re
+import sqlite3
+import tempfile
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+from urllib.parse import urlparse
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is only offered when pyarrow is installed
+    pa = None
+    pq = None
+
+DEFAULT_BATCH_SIZE = 500
+
+MEDIA_URL = re.compile(r'\.(m3u8|mpd|mp4|m4s|ts|webm|key)(?:\?|$)', re.IGNORECASE)
+IMAGE_URL = re.compile(r'\.(jpe?g|png|gif|webp|avif|svg)(?:\?|$)', re.IGNORECASE)
+IMAGE_KEY = re.compile(r'image|img|thumbnail|poster|photo', re.IGNORECASE)
+
+# Columns of each normalized table, after the page_id every row starts with
+TABLE_COLUMNS = {
+    "links": ["property", "url", "host"],
+    "images": ["property", "url", "host"],
+    "media_urls": ["property", "url", "host", "kind"],
+    "network_requests": ["property", "url", "host"]
+}
+PAGE_COLUMNS = ["url", "host", "error", "freshness", "data"]
+
+# Metadata that differs on every run; published outputs keep it in a sidecar file
+VOLATILE_METADATA = {"timestamp", "metrics"}
+
+class JsonlSink:
+    """Appends one JSON record per line as results arrive; a crash loses at most the line being written."""
+
+    def __init__(self, path: str, append: bool = True):
+        self.path = path
+        self.file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class JsonOutput:
+    """The classic output.json document: run metadata plus the list of page records."""
+
+    def __init__(self, path: str, metadata: Dict[str, Any]):
+        self.path = path
+        self.metadata = metadata
+        self.records: List[Dict[str, Any]] = []
+
+    def write(self, record: Dict[str, Any]):
+        self.records.append(record)
+
+    def close(self):
+        with open(self.path, "w", encoding="utf-8") as outfile:
+            json.dump({"metadata": self.metadata, "data": self.records}, outfile, indent=2, ensure_ascii=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def structural_diff(old: Any, new: Any, path: Tuple = ()) -> List[Tuple]:
+    """Operations turning old into new: ("replace", path, value), ("add", path, value) or ("remove", path).
+
+    Dicts are compared key by key and lists position by position, so an
+    unchanged subtree yields no operations at all.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append(("remove", path + (key,)))
+        for key, value in new.items():
+            if key in old:
+                ops.extend(structural_diff(old[key], value, path + (key,)))
+            else:
+                ops.append(("add", path + (key,), value))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        for index, (before, after) in enumerate(zip(old, new)):
+            ops.extend(structural_diff(before, after, path + (index,)))
+        # Removals from the end first, so earlier indices stay valid
+        for index in range(len(old) - 1, len(new) - 1, -1):
+            ops.append(("remove", path + (index,)))
+        for index in range(len(old), len(new)):
+            ops.append(("add", path + (index,), new[index]))
+        return ops
+    if old == new and type(old) is type(new):
+        return []
+    return [("replace", path, new)]
+
+def apply_diff(document: Any, ops: List[Tuple]) -> Any:
+    """Apply structural_diff operations in place; returns the (possibly replaced) root."""
+    for op in ops:
+        kind, path = op[0], op[1]
+        if not path:
+            document = op[2]
+            continue
+        parent = document
+        for key in path[:-1]:
+            parent = parent[key]
+        key = path[-1]
+        if kind == "remove":
+            del parent[key]
+        elif kind == "add" and isinstance(parent, list):
+            parent.insert(key, op[2])
+        else:
+            parent[key] = op[2]
+    return document
+
+def sidecar_path(path: str) -> str:
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.meta{extension or '.json'}"
+
+def write_json_atomic(path: str, value: Any, **dump_options):
+    # Write next to the target and rename, so readers never see a half-written file
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False, **dump_options)
+            f.write("\n")
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def publish_json(path: str, data: Any, metadata: Dict[str, Any]) -> bool:
+    """Publish {"metadata", "data"} so the file only changes when the content does.
+
+    Keys are written sorted and volatile metadata goes to a sidecar
+    (output.json -> output.meta.json). The new document is the previous one with
+    the structural diff applied, and nothing is written at all when the diff is
+    empty. Returns whether the document changed.
+    """
+    document = json.loads(json.dumps({
+        "metadata": {key: value for key, value in metadata.items() if key not in VOLATILE_METADATA},
+        "data": data
+    }, ensure_ascii=False))
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        previous = None
+    ops = structural_diff(previous, document) if previous is not None else None
+    changed = ops is None or bool(ops)
+    if changed:
+        published = apply_diff(previous, ops) if ops is not None else document
+        write_json_atomic(path, published, indent=2, sort_keys=True)
+    volatile = {key: value for key, value in metadata.items() if key in VOLATILE_METADATA}
+    volatile["changes"] = len(ops) if ops is not None else None
+    write_json_atomic(sidecar_path(path), volatile, indent=2, sort_keys=True)
+    return changed
+
+class PublishedJsonOutput(JsonOutput):
+    """JsonOutput written with publish_json, for outputs committed to a repository on a schedule."""
+
+    def close(self):
+        publish_json(self.path, self.records, self.metadata)
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+def iter_urls(value: Any, path: str) -> Iterator[Tuple[str, str]]:
+    """Every absolute URL in an extracted value, with the property path it was found under."""
+    if isinstance(value, str):
+        if value.startswith(("http://", "https://")):
+            yield path, value
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_urls(item, path)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from iter_urls(item, f"{path}.{key}")
+
+def normalize_record(record: Dict[str, Any], schema: Dict[str, Any], default_url: Optional[str] = None) -> Tuple[List[Any], Dict[str, List[List[Any]]]]:
+    """Split one page record into its pages row and the rows of the URL tables."""
+    url = record.get("url") or default_url
+    page = [url, host_of(url) if url else None, record.get("error"), record.get("freshness"), json.dumps(record, ensure_ascii=False)]
+    rows: Dict[str, List[List[Any]]] = {table: [] for table in TABLE_COLUMNS}
+    network_keys = {
+        key for key, config in (schema.get("post_actions") or {}).items()
+        if config.get("type") == "network" and not config.get("media_only")
+    }
+    seen = set()
+    for key, value in record.items():
+        if key == "url":
+            continue
+        for path, found in iter_urls(value, key):
+            media = MEDIA_URL.search(found)
+            if key in network_keys:
+                table = "network_requests"
+            elif media or key in ("media_urls", "response_bodies"):
+                table = "media_urls"
+            elif IMAGE_URL.search(found) or IMAGE_KEY.search(path):
+                table = "images"
+            else:
+                table = "links"
+            if (table, path, found) in seen:
+                continue
+            seen.add((table, path, found))
+            row = [path, found, host_of(found)]
+            if table == "media_urls":
+                row.append(media.group(1).lower() if media else None)
+            rows[table].append(row)
+    return page, rows
+
+class SqliteOutput:
+    """Normalized run output: one row per page, plus one row per link, image, media URL and network request.
+
+    Rows are buffered and inserted in batches, one transaction per batch.
+    """
+
+    def __init__(self, path: str, schema: Dict[str, Any], metadata: Dict[str, Any], batch_size: int = DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.schema = schema
+        self.batch_size = batch_size
+        self.default_url = metadata.get("url")
+        self.pending: List[Tuple[List[Any], Dict[str, List[List[Any]]]]] = []
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT,
+                version TEXT,
+                metadata TEXT
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id INTEGER NOT NULL REFERENCES runs(id),
+                url TEXT,
+                host TEXT,
+                error TEXT,
+                freshness TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_url ON pages (url);
+        """)
+        for table, columns in TABLE_COLUMNS.items():
+            self.db.execute(f"CREATE TABLE IF NOT EXISTS {table} (page_id INTEGER NOT NULL REFERENCES pages(id), {', '.join(f'{c} TEXT' for c in columns)})")
+            self.db.execute(f"CREATE INDEX IF NOT EXISTS {table}_host ON {table} (host)")
+            self.db.execute(f"CREATE INDEX IF NOT EXISTS {table}_page ON {table} (page_id)")
+        cursor = self.db.execute(
+            "INSERT INTO runs (timestamp, version, metadata) VALUES (?, ?, ?)",
+            (metadata.get("timestamp"), metadata.get("version"), json.dumps(metadata, ensure_ascii=False))
+        )
+        self.run_id = cursor.lastrowid
+        self.db.commit()
+
+    def write(self, record: Dict[str, Any]):
+        self.pending.append(normalize_record(record, self.schema, self.default_url))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.db:  # One transaction for the whole batch
+            table_rows: Dict[str, List[List[Any]]] = {table: [] for table in TABLE_COLUMNS}
+            for page, rows in self.pending:
+                page_id = self.db.execute(
+                    f"INSERT INTO pages (run_id, {', '.join(PAGE_COLUMNS)}) VALUES (?, {', '.join('?' for _ in PAGE_COLUMNS)})",
+                    [self.run_id] + page
+                ).lastrowid
+                for table, table_batch in rows.items():
+                    table_rows[table].extend([page_id] + row for row in table_batch)
+            for table, batch in table_rows.items():
+                if batch:
+                    columns = TABLE_COLUMNS[table]
+                    self.db.executemany(
+                        f"INSERT INTO {table} (page_id, {', '.join(columns)}) VALUES (?, {', '.join('?' for _ in columns)})",
+                        batch
+                    )
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ParquetOutput:
+    """The same normalized tables as SqliteOutput, as one Parquet file per table (<stem>.<table>.parquet)."""
+
+    def __init__(self, path: str, schema: Dict[str, Any], metadata: Dict[str, Any], batch_size: int = DEFAULT_BATCH_SIZE):
+        if pa is None:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+        self.stem = path[:-len(".parquet")] if path.endswith(".parquet") else path
+        self.schema = schema
+        self.batch_size = batch_size
+        self.default_url = metadata.get("url")
+        self.metadata = {"run": json.dumps(metadata, ensure_ascii=False)}
+        self.next_page_id = 1
+        self.tables = {"pages": ["page_id"] + PAGE_COLUMNS, **{table: ["page_id"] + columns for table, columns in TABLE_COLUMNS.items()}}
+        self.buffers: Dict[str, List[List[Any]]] = {table: [] for table in self.tables}
+        self.writers: Dict[str, Any] = {}
+        self.pages_buffered = 0
+
+    def _arrow_schema(self, table: str):
+        fields = [pa.field("page_id", pa.int64())] + [pa.field(column, pa.string()) for column in self.tables[table][1:]]
+        return pa.schema(fields, metadata=self.metadata)
+
+    def write(self, record: Dict[str, Any]):
+        page, rows = normalize_record(record, self.schema, self.default_url)
+        page_id = self.next_page_id
+        self.next_page_id += 1
+        self.buffers["pages"].append([page_id] + page)
+        for table, table_rows in rows.items():
+            self.buffers[table].extend([page_id] + row for row in table_rows)
+        self.pages_buffered += 1
+        if self.pages_buffered >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Each flush becomes a row group, so memory stays bounded on long runs
+        for table, rows in self.buffers.items():
+            if not rows:
+                continue
+            if table not in self.writers:
+                self.writers[table] = pq.ParquetWriter(f"{self.stem}.{table}.parquet", self._arrow_schema(table))
+            columns = list(zip(*rows))
+            self.writers[table].write_table(pa.Table.from_arrays([pa.array(column) for column in columns], schema=self._arrow_schema(table)))
+            self.buffers[table] = []
+        self.pages_buffered = 0
+
+    def close(self):
+        self.flush()
+        for writer in self.writers.values():
+            writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+OUTPUT_FORMATS = ["json", "published", "jsonl", "sqlite", "parquet"]
+FORMAT_EXTENSIONS = {".json": "json", ".jsonl": "jsonl", ".ndjson": "jsonl", ".db": "sqlite", ".sqlite": "sqlite", ".sqlite3": "sqlite", ".parquet": "parquet"}
+
+def open_output(path: str, schema: Dict[str, Any], metadata: Dict[str, Any], output_format: Optional[str] = None):
+    """Open the output backend for a path, picking the format from its extension unless one is given."""
+    output_format = output_format or FORMAT_EXTENSIONS.get(os.path.splitext(path)[1].lower(), "json")
+    if output_format == "json":
+        return JsonOutput(path, metadata)
+    if output_format == "published":
+        return PublishedJsonOutput(path, metadata)
+    if output_format == "jsonl":
+        return JsonlSink(path, append=False)
+    if output_format == "sqlite":
+        return SqliteOutput(path, schema, metadata)
+    if output_format == "parquet":
+        return ParquetOutput(path, schema, metadata)
+    raise ValueError(f"Unknown output format: {output_format}")
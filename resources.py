@@ -0,0 +1,67 @@
+import os
+from typing import Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:  # /proc is enough on Linux runners
+    psutil = None
+
+def available_memory_mb() -> Optional[float]:
+    """Memory the system can hand out without swapping, or None if it can't be determined."""
+    if psutil is not None:
+        return psutil.virtual_memory().available / (1024 * 1024)
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def has_memory_headroom(min_free_mb: float) -> bool:
+    """Whether there is room for another browser tab; assumes yes when memory can't be measured."""
+    available = available_memory_mb()
+    return available is None or available >= min_free_mb
+
+def process_tree_rss_mb(pid: int) -> float:
+    """Resident memory of a process and all its descendants (e.g. the browser and its renderers)."""
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return 0.0
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        return total / (1024 * 1024)
+    
+    # Build the parent -> children map from /proc, then sum VmRSS over the subtree
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r", encoding="utf-8") as f:
+                # The command name may contain spaces; fields after it are space-separated
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    total_kb, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status", "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return total_kb / 1024
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Dict, Optional, Any
+from frontier import canonicalize_url
+
+DEFAULT_CACHE_FILE = "result_cache.db"
+DEFAULT_CACHE_TTL = 3600  # seconds
+DEFAULT_CACHE_MAX_MB = 256
+
+# Schema keys that change how a run is executed but not what a page yields
+OPERATIONAL_KEYS = {
+    "url", "url_template", "url_range", "cache", "concurrency", "prefetch",
+    "circuit_breaker", "load_strategy", "extraction_deadline"
+}
+
+def schema_cache_id(schema: Dict[str, Any]) -> str:
+    """Hash of the parts of a schema that determine a page's result."""
+    relevant = {key: value for key, value in schema.items() if key not in OPERATIONAL_KEYS}
+    return hashlib.sha1(json.dumps(relevant, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """Page results keyed by canonical URL and schema, evicted least-recently-used past a size limit.
+
+    Entries carry no expiry of their own: each reader decides how old is too old,
+    so one schema's TTL (or a --max-age override) never throws away another's results.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_FILE, max_mb: float = DEFAULT_CACHE_MAX_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                url TEXT NOT NULL,
+                schema_id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                stored REAL NOT NULL,
+                used REAL NOT NULL,
+                PRIMARY KEY (url, schema_id)
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+        self.db.commit()
+
+    def get(self, url: str, schema_id: str, max_age: float, count: bool = True) -> Optional[Dict[str, Any]]:
+        """A stored result no older than max_age seconds, or None; count=False peeks without touching the stats."""
+        key = canonicalize_url(url)
+        row = self.db.execute("SELECT data, stored FROM results WHERE url = ? AND schema_id = ?", (key, schema_id)).fetchone()
+        if row is None or time.time() - row[1] > max_age:
+            if count:
+                self.misses += 1
+            return None
+        if not count:
+            return json.loads(row[0])
+        self.db.execute("UPDATE results SET used = ? WHERE url = ? AND schema_id = ?", (time.time(), key, schema_id))
+        self.db.commit()
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, url: str, schema_id: str, data: Dict[str, Any]):
+        body = json.dumps(data, ensure_ascii=False)
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO results (url, schema_id, data, bytes, stored, used) VALUES (?, ?, ?, ?, ?, ?)",
+            (canonicalize_url(url), schema_id, body, len(body), now, now)
+        )
+        self.evict()
+        self.db.commit()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits its size limit."""
+        total = self.db.execute("SELECT COALESCE(SUM(bytes), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for url, schema_id, size in self.db.execute("SELECT url, schema_id, bytes FROM results ORDER BY used"):
+            doomed.append((url, schema_id))
+            freed += size
+            if freed >= excess:
+                break
+        self.db.executemany("DELETE FROM results WHERE url = ? AND schema_id = ?", doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hits / lookups, 3) if lookups else None}
+
+    def close(self):
+        self.db.close()
+
+def cache_max_age(schema: Dict[str, Any], override: Optional[float] = None) -> float:
+    """How old a cached result may be: --max-age if given, else the schema's TTL."""
+    if override is not None:
+        return override
+    return (schema.get("cache") or {}).get("ttl", DEFAULT_CACHE_TTL)
+
+def open_result_cache(schema: Dict[str, Any], path: Optional[str] = None, max_age: Optional[float] = None) -> Optional[ResultCache]:
+    """The cache a run should use: on when the schema has a cache section or a max age is forced."""
+    config = schema.get("cache")
+    if config is None and max_age is None:
+        return None
+    config = config or {}
+    return ResultCache(path or config.get("file", DEFAULT_CACHE_FILE), config.get("max_mb", DEFAULT_CACHE_MAX_MB))
@@ -0,0 +1,413 @@
+import argparse
+import difflib
+import json
+import re
+import sys
+from typing import Callable, Dict, List, Optional, Any, Iterable, Tuple
+
+# A check appends "path: message" strings to the error list; specs are built from
+# these once, so validating a schema or a record is just a walk over closures.
+# Containers check children against a scratch list and only build a child's path
+# (and re-check it) when it has errors, so valid data never formats a path.
+Check = Callable[[Any, str, List[str]], None]
+
+TYPE_NAMES = {str: "string", int: "integer", float: "number", bool: "boolean", list: "array", dict: "object", type(None): "null"}
+
+def type_name(value: Any) -> str:
+    return TYPE_NAMES.get(type(value), type(value).__name__)
+
+def is_type(*types: type) -> Check:
+    # bool is an int subclass; a number field shouldn't accept true/false
+    wanted = tuple(types)
+    names = " or ".join(TYPE_NAMES[t] for t in types)
+    def check(value, path, errors):
+        if not isinstance(value, wanted) or (isinstance(value, bool) and bool not in wanted):
+            errors.append(f"{path}: expected {names}, got {type_name(value)}")
+    return check
+
+def all_of(*checks: Check) -> Check:
+    def check(value, path, errors):
+        count = len(errors)
+        for each in checks:
+            each(value, path, errors)
+            if len(errors) > count:
+                return  # Later checks assume the earlier ones passed
+    return check
+
+def one_of(*choices: str) -> Check:
+    allowed = set(choices)
+    def check(value, path, errors):
+        if value not in allowed:
+            hint = difflib.get_close_matches(str(value), sorted(allowed), n=1)
+            suggestion = f" (did you mean '{hint[0]}'?)" if hint else ""
+            errors.append(f"{path}: unknown value {json.dumps(value)}{suggestion}; expected one of {', '.join(sorted(allowed))}")
+    return check
+
+def valid_regex(value, path, errors):
+    if not isinstance(value, str):
+        errors.append(f"{path}: expected string, got {type_name(value)}")
+        return
+    try:
+        re.compile(value)
+    except re.error as e:
+        errors.append(f"{path}: invalid regex ({e})")
+
+def positive(value, path, errors):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        errors.append(f"{path}: expected a positive number, got {json.dumps(value)}")
+
+def list_of(item: Check) -> Check:
+    def check(value, path, errors):
+        if not isinstance(value, list):
+            errors.append(f"{path}: expected array, got {type_name(value)}")
+            return
+        scratch: List[str] = []
+        for element in value:
+            item(element, path, scratch)
+            if scratch:
+                break
+        if scratch:
+            for index, element in enumerate(value):
+                item(element, f"{path}[{index}]", errors)
+    return check
+
+def dict_of(item: Check) -> Check:
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            errors.append(f"{path}: expected object, got {type_name(value)}")
+            return
+        scratch: List[str] = []
+        for element in value.values():
+            item(element, path, scratch)
+            if scratch:
+                break
+        if scratch:
+            for key, element in value.items():
+                item(element, f"{path}.{key}", errors)
+    return check
+
+def obj(fields: Dict[str, Check], required: Iterable[str] = (), open_keys: bool = False) -> Check:
+    """An object with known fields; unknown keys are errors (with a spelling hint) unless open_keys."""
+    required = list(required)
+    known = sorted(fields)
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            errors.append(f"{path}: expected object, got {type_name(value)}")
+            return
+        for key in required:
+            if key not in value:
+                errors.append(f"{path}: missing required '{key}'")
+        for key, element in value.items():
+            field = fields.get(key)
+            if field is not None:
+                scratch: List[str] = []
+                field(element, path, scratch)
+                if scratch:
+                    field(element, f"{path}.{key}", errors)
+            elif not open_keys:
+                hint = difflib.get_close_matches(key, known, n=1)
+                errors.append(f"{path}.{key}: unknown key" + (f" (did you mean '{hint[0]}'?)" if hint else ""))
+    return check
+
+def by_type(variants: Dict[str, Check], default: Optional[str] = None) -> Check:
+    """Dispatch on the object's "type" field."""
+    type_check = one_of(*variants)
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            errors.append(f"{path}: expected object, got {type_name(value)}")
+            return
+        kind = value.get("type", default)
+        if kind is None:
+            errors.append(f"{path}: missing required 'type'")
+            return
+        if kind not in variants:
+            type_check(kind, f"{path}.type", errors)
+            return
+        variants[kind](value, path, errors)
+    return check
+
+STRING = is_type(str)
+BOOL = is_type(bool)
+NUMBER = is_type(int, float)
+INTEGER = is_type(int)
+OBJECT = is_type(dict)
+SELECTOR_TYPE = one_of("css", "xpath")
+OVERFLOW = one_of("truncate", "digest", "blob")
+FRAME = obj({"url_pattern": valid_regex, "depth": INTEGER, "min_depth": INTEGER, "max_depth": INTEGER})
+FILTER = obj({"attribute": STRING, "pattern": valid_regex}, required=["attribute", "pattern"])
+
+VALUE_FIELDS = {
+    "type": STRING,
+    "selector_type": SELECTOR_TYPE,
+    "selector": STRING,
+    "attribute": STRING,
+    "process_base64": BOOL,
+    "max_bytes": all_of(INTEGER, positive),
+    "overflow": OVERFLOW
+}
+
+ITEM_PROPERTY = obj({**VALUE_FIELDS, "type": one_of("string")}, required=["selector"])
+
+COMMON_PROPERTY_FIELDS = {
+    **VALUE_FIELDS,
+    "depends_on": list_of(STRING),
+    "frame": FRAME
+}
+
+PROPERTY = by_type({
+    "string": obj(COMMON_PROPERTY_FIELDS, required=["selector"]),
+    "array": obj({
+        **COMMON_PROPERTY_FIELDS,
+        # A filter inside items is accepted but does nothing; schema_warnings points it out
+        "items": obj({"properties": all_of(OBJECT, dict_of(ITEM_PROPERTY)), "filter": FILTER}, required=["properties"]),
+        "filter": FILTER
+    }, required=["selector", "items"]),
+    "regex": obj({**COMMON_PROPERTY_FIELDS, "pattern": valid_regex}, required=["selector", "pattern"]),
+    "stories": obj({
+        **COMMON_PROPERTY_FIELDS,
+        "title_selector": STRING,
+        "article_selector": STRING,
+        "image_selector": STRING,
+        "max_distance": positive,
+        "min_image_area": NUMBER,
+        "min_score": NUMBER,
+        "weights": obj({"ancestry": NUMBER, "proximity": NUMBER, "alt": NUMBER})
+    }, required=["selector"])
+})
+
+POST_ACTION_FIELDS = {
+    "type": STRING,
+    "selector_type": SELECTOR_TYPE,
+    "selector": STRING,
+    "attribute": STRING,
+    "methods": list_of(one_of("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS")),
+    "pattern": valid_regex,
+    "media_only": BOOL,
+    "frame": FRAME
+}
+
+# Any type other than network/mutations is a selector extraction
+POST_ACTION_VARIANTS = {
+    "network": obj(POST_ACTION_FIELDS, required=["pattern"]),
+    "mutations": obj(POST_ACTION_FIELDS)
+}
+SELECTOR_POST_ACTION = obj(POST_ACTION_FIELDS, required=["selector"])
+
+def post_action(value, path, errors):
+    if not isinstance(value, dict):
+        errors.append(f"{path}: expected object, got {type_name(value)}")
+        return
+    POST_ACTION_VARIANTS.get(value.get("type"), SELECTOR_POST_ACTION)(value, path, errors)
+
+ACTION_FIELDS = {
+    "type": one_of("click", "hover", "wait", "scroll"),
+    "selector_type": SELECTOR_TYPE,
+    "selector": STRING,
+    "match_text": valid_regex,
+    "value": STRING,
+    "duration": NUMBER,
+    "retries": all_of(INTEGER, positive)
+}
+
+ACTION = obj(ACTION_FIELDS, required=["type"])
+
+def action(value, path, errors):
+    ACTION(value, path, errors)
+    if isinstance(value, dict) and value.get("type") in ("click", "hover") and not value.get("selector"):
+        errors.append(f"{path}: '{value['type']}' needs a selector")
+
+FOLLOW_RULE = obj({"property": STRING, "field": STRING}, required=["property"])
+
+# Sections owned by other modules are only shape-checked here; their own code reads the details
+SCHEMA = obj({
+    "url": STRING,
+    "url_template": STRING,
+    "url_range": obj({"start": INTEGER, "end": INTEGER, "max_misses": INTEGER}, open_keys=True),
+    "properties": all_of(OBJECT, dict_of(PROPERTY)),
+    "actions": list_of(action),
+    "post_actions": all_of(OBJECT, dict_of(post_action)),
+    "enable_media_capture": BOOL,
+    "enable_hidden_links": BOOL,
+    "enable_base64_decode": BOOL,
+    "scan_javascript": BOOL,
+    "max_page_scroll": INTEGER,
+    "blob_store": STRING,
+    "extraction_deadline": positive,
+    "load_strategy": is_type(str, dict),
+    "circuit_breaker": OBJECT,
+    "concurrency": is_type(int, dict),
+    "crawl": obj({
+        "follow": list_of(FOLLOW_RULE),
+        "pattern": valid_regex,
+        "properties": all_of(OBJECT, dict_of(PROPERTY)),
+        "actions": list_of(action),
+        "post_actions": all_of(OBJECT, dict_of(post_action))
+    }, open_keys=True),
+    "mutation_capture": obj({"pattern": valid_regex}, open_keys=True),
+    "prefetch": is_type(int, dict),
+    "response_capture": obj({"pattern": valid_regex}, open_keys=True),
+    "static": is_type(bool, dict),
+    "cache": OBJECT,
+    "change_detection": is_type(bool, dict),
+    "feeds": is_type(bool, dict),
+    "followup": obj({"follow": list_of(FOLLOW_RULE), "pattern": valid_regex, "hosts": list_of(obj({
+        "pattern": valid_regex,
+        "properties": all_of(OBJECT, dict_of(PROPERTY))
+    }, required=["pattern", "properties"], open_keys=True))}, open_keys=True)
+}, required=["properties"])
+
+def property_groups(schema: Dict[str, Any], path: str) -> List[Tuple[Dict[str, Any], str]]:
+    """Every set of properties in a (well-shaped) schema, with its path."""
+    groups = [(schema["properties"], f"{path}.properties")]
+    if "properties" in (schema.get("crawl") or {}):
+        groups.append((schema["crawl"]["properties"], f"{path}.crawl.properties"))
+    for index, rule in enumerate((schema.get("followup") or {}).get("hosts", [])):
+        groups.append((rule["properties"], f"{path}.followup.hosts[{index}].properties"))
+    return groups
+
+def dependency_errors(properties: Dict[str, Any], path: str) -> List[str]:
+    """depends_on names that don't exist, and cycles (which would leave their properties waiting out the deadline)."""
+    errors: List[str] = []
+    for key, value in properties.items():
+        for dependency in value.get("depends_on", []):
+            if dependency not in properties:
+                errors.append(f"{path}.{key}.depends_on: no property named '{dependency}'")
+    finished = set()
+    def visit(key: str, trail: List[str]):
+        for dependency in properties[key].get("depends_on", []):
+            if dependency in trail:
+                cycle = trail[trail.index(dependency):] + [dependency]
+                errors.append(f"{path}.{key}.depends_on: cycle {' -> '.join(cycle)}")
+            elif dependency in properties and dependency not in finished:
+                visit(dependency, trail + [dependency])
+        finished.add(key)
+    for key in properties:
+        if key not in finished:
+            visit(key, [key])
+    return errors
+
+def validate_schema(schema: Any, path: str = "schema", require_url: bool = True) -> List[str]:
+    """Every problem in a schema, as "path: message" strings; empty when it's valid.
+
+    require_url=False is for callers that supply the URLs themselves (the service).
+    """
+    errors: List[str] = []
+    SCHEMA(schema, path, errors)
+    if errors or not isinstance(schema, dict):
+        return errors
+    if require_url and "url" not in schema and "url_template" not in schema:
+        errors.append(f"{path}: needs 'url' or 'url_template'")
+    if "url_range" in schema and "url_template" not in schema:
+        errors.append(f"{path}.url_range: only applies with 'url_template'")
+    properties = schema["properties"]
+    # References between sections are checked once the shapes are known to be right
+    for group, group_path in property_groups(schema, path):
+        errors.extend(dependency_errors(group, group_path))
+    for section in ("crawl", "followup"):
+        for index, rule in enumerate((schema.get(section) or {}).get("follow", [])):
+            if rule["property"] not in properties:
+                errors.append(f"{path}.{section}.follow[{index}].property: no property named '{rule['property']}'")
+    feeds = schema.get("feeds")
+    if isinstance(feeds, dict):
+        wanted = feeds.get("properties") or []
+        for prop in wanted:
+            if prop not in properties:
+                errors.append(f"{path}.feeds.properties: no property named '{prop}'")
+            elif properties[prop].get("type") != "array":
+                errors.append(f"{path}.feeds.properties.{prop}: feeds only fill array properties")
+            elif isinstance(wanted, dict):
+                # Mapped fields land in the property's items, so they have to be fields it declares
+                fields = properties[prop].get("items", {}).get("properties", {})
+                mapping = wanted[prop]
+                if not isinstance(mapping, dict):
+                    errors.append(f"{path}.feeds.properties.{prop}: expected object, got {type_name(mapping)}")
+                    continue
+                for field in mapping:
+                    if field not in fields:
+                        errors.append(f"{path}.feeds.properties.{prop}.{field}: not a field of {prop}'s items")
+    return errors
+
+def schema_warnings(schema: Dict[str, Any], path: str = "schema") -> List[str]:
+    """Things a valid schema probably doesn't mean, which don't stop it from running."""
+    warnings = []
+    for group, group_path in property_groups(schema, path):
+        for key, value in group.items():
+            if "filter" in value.get("items", {}):
+                warnings.append(f"{group_path}.{key}.items.filter: has no effect; filters are read next to 'items', not inside it")
+    return warnings
+
+def value_check(config: Dict[str, Any]) -> Check:
+    """What an extracted string may look like: text, or a digest/blob reference when it overflowed."""
+    if config.get("max_bytes") is not None and config.get("overflow") in ("digest", "blob"):
+        return is_type(str, dict, type(None))
+    return is_type(str, type(None))
+
+STORY = obj({"title": is_type(str), "image": is_type(str, type(None)), "article": is_type(str)})
+
+def property_output_check(config: Dict[str, Any]) -> Check:
+    kind = config.get("type")
+    if kind == "array":
+        element = obj({key: value_check(value) for key, value in config["items"]["properties"].items()})
+    elif kind == "regex":
+        element = STRING
+    elif kind == "stories":
+        element = STORY
+    else:
+        element = value_check(config)
+        # Frame-scoped properties merge one value per frame into a list, even for strings
+        if "frame" not in config:
+            return element
+    items = list_of(element)
+    def check(value, path, errors):
+        if value is not None:
+            items(value, path, errors)
+    return check
+
+STRING_LIST = list_of(STRING)
+
+def compile_record_validator(schema: Dict[str, Any]) -> Callable[[Dict[str, Any], str], List[str]]:
+    """Validator for the page records a (valid) schema produces, built once per schema.
+
+    Only declared properties and post-actions are checked; the extra keys a run
+    adds (url, error, media_urls, ...) are left alone. Any value may be null,
+    since failed pages report every property as null.
+    """
+    checks: List[Tuple[str, Check]] = [(key, property_output_check(value)) for key, value in schema["properties"].items()]
+    for key in schema.get("post_actions") or {}:
+        checks.append((key, lambda value, path, errors: value is None or STRING_LIST(value, path, errors)))
+
+    def validate(record: Dict[str, Any], path: str = "record") -> List[str]:
+        errors: List[str] = []
+        if not isinstance(record, dict):
+            return [f"{path}: expected object, got {type_name(record)}"]
+        for key, check in checks:
+            if key in record:
+                check(record[key], f"{path}.{key}", errors)
+        return errors
+    return validate
+
+def main():
+    parser = argparse.ArgumentParser(description="Check schema files without launching a browser")
+    parser.add_argument("schemas", nargs="+", help="Schema files to check")
+    args = parser.parse_args()
+    failed = False
+    for path in args.schemas:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                schema = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"{path}: {e}")
+            failed = True
+            continue
+        errors = validate_schema(schema, path)
+        for error in errors:
+            print(error)
+        if not errors:
+            for warning in schema_warnings(schema, path):
+                print(f"warning: {warning}")
+            print(f"{path}: ok")
+        failed = failed or bool(errors)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
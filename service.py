@@ -0,0 +1,218 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any, Tuple
+from aiohttp import web
+from playwright.async_api import async_playwright, Browser, BrowserContext
+from browser_profiles import BROWSER_PROFILES
+from job_queue import schema_fingerprint
+from load_strategy import LoadStats, LOAD_STATS_FILE
+from schema_validator import validate_schema, schema_warnings
+from sonnet import ScrapeSession, RunOptions, SCRIPT_VERSION, create_browser_context, get_schema_urls, scrape_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_SESSIONS = 32  # schemas kept warm; inline schemas would otherwise pile up forever
+SCHEMA_NAME = re.compile(r'^[\w.-]+$')
+SCHEMA_EXTENSIONS = [".schema", ".json"]
+
+class BrowserPool:
+    """Pre-launched browser contexts handed out one page run at a time.
+
+    Normal and static (JavaScript disabled) schemas need differently configured
+    browsers, so each kind has its own pool; the normal one is launched up front.
+    """
+
+    def __init__(self, playwright, size: int, profile_name: Optional[str] = None):
+        self.playwright = playwright
+        self.size = size
+        self.profile_name = profile_name
+        self.idle: Dict[bool, asyncio.Queue] = {False: asyncio.Queue(), True: asyncio.Queue()}
+        self.launched: Dict[bool, List[Tuple[BrowserContext, Browser]]] = {False: [], True: []}
+        self._launch_lock = asyncio.Lock()
+
+    async def _launch(self, static: bool):
+        context, browser = await create_browser_context(self.playwright, static=static, profile_name=self.profile_name)
+        self.launched[static].append((context, browser))
+        self.idle[static].put_nowait(context)
+
+    async def start(self):
+        await asyncio.gather(*(self._launch(False) for _ in range(self.size)))
+        logger.info(f"Browser pool ready with {self.size} warm contexts")
+
+    async def acquire(self, static: bool = False) -> BrowserContext:
+        # Launch lazily up to the pool size; after that, wait for a context to come back
+        if self.idle[static].empty():
+            async with self._launch_lock:
+                if self.idle[static].empty() and len(self.launched[static]) < self.size:
+                    await self._launch(static)
+        return await self.idle[static].get()
+
+    def release(self, context: BrowserContext, static: bool = False):
+        self.idle[static].put_nowait(context)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            kind: {"launched": len(self.launched[static]), "idle": self.idle[static].qsize()}
+            for kind, static in (("default", False), ("static", True))
+        }
+
+    async def close(self):
+        for static in (False, True):
+            for context, browser in self.launched[static]:
+                await context.close()
+                await browser.close()
+
+class ScrapeService:
+    """HTTP front end that runs schemas on the warm browser pool."""
+
+    def __init__(self, pool: BrowserPool, schema_dir: str, options: RunOptions, max_sessions: int = DEFAULT_MAX_SESSIONS):
+        self.pool = pool
+        self.schema_dir = schema_dir
+        self.options = options
+        self.max_sessions = max_sessions
+        # Sessions keep circuit breakers and caches warm between requests, least recently used first;
+        # host load timings are shared by all of them and saved once
+        self.sessions: "OrderedDict[str, ScrapeSession]" = OrderedDict()
+        self.busy: Dict[ScrapeSession, int] = {}  # requests still running on each session
+        self.load_stats = LoadStats(options.get("load_stats_file") or LOAD_STATS_FILE)
+
+    def load_schema(self, name: str) -> Dict[str, Any]:
+        if not SCHEMA_NAME.match(name):
+            raise web.HTTPBadRequest(text=f"Invalid schema name: {name}")
+        for extension in [""] + SCHEMA_EXTENSIONS:
+            path = os.path.join(self.schema_dir, name + extension)
+            if os.path.isfile(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        raise web.HTTPNotFound(text=f"No schema named {name} in {self.schema_dir}")
+
+    def session_for(self, schema: Dict[str, Any]) -> ScrapeSession:
+        key = schema_fingerprint(schema)
+        if key in self.sessions:
+            self.sessions.move_to_end(key)
+            return self.sessions[key]
+        self.sessions[key] = ScrapeSession(schema, self.options, load_stats=self.load_stats)
+        # Sessions with requests in flight are never closed under them; the bound catches up later
+        for old_key in [k for k in self.sessions if k != key and self.sessions[k] not in self.busy][:max(0, len(self.sessions) - self.max_sessions)]:
+            self.sessions.pop(old_key).close()
+        return self.sessions[key]
+
+    async def run_url(self, session: ScrapeSession, url: str) -> Dict[str, Any]:
+        context = await self.pool.acquire(session.static)
+        try:
+            return await scrape_url(session, context, url)
+        finally:
+            self.pool.release(context, session.static)
+
+    async def parse_request(self, request: web.Request) -> Tuple[ScrapeSession, List[str], bool]:
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(text="Request body must be JSON")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="Request body must be a JSON object")
+        schema = body.get("schema")
+        if isinstance(schema, str):
+            schema = self.load_schema(schema)
+        if not isinstance(schema, dict) or "properties" not in schema:
+            raise web.HTTPBadRequest(text="'schema' must be a schema object or the name of a schema file")
+        # Requests can bring their own URLs, so the schema needn't have one
+        errors = validate_schema(schema, require_url=False)
+        if errors:
+            raise web.HTTPBadRequest(text="Invalid schema:\n" + "\n".join(errors))
+        for warning in schema_warnings(schema):
+            logger.warning(warning)
+        urls = body.get("urls") or ([body["url"]] if body.get("url") else get_schema_urls(schema))
+        stream = bool(body.get("stream")) or request.query.get("stream") in ("1", "true")
+        return self.session_for(schema), urls, stream
+
+    async def handle_scrape(self, request: web.Request) -> web.StreamResponse:
+        session, urls, stream = await self.parse_request(request)
+        self.busy[session] = self.busy.get(session, 0) + 1
+        tasks = [asyncio.create_task(self.run_url(session, url)) for url in urls]
+        try:
+            if stream:
+                # One JSON line per page as soon as it finishes
+                response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+                await response.prepare(request)
+                pending = dict(zip(tasks, urls))
+                while pending:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        line = {"url": pending.pop(task), "data": task.result()}
+                        await response.write((json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8"))
+                await response.write_eof()
+                return response
+            data = await asyncio.gather(*tasks)
+            return web.json_response({
+                "metadata": {
+                    "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                    "version": SCRIPT_VERSION,
+                    "url": session.schema.get("url") or session.schema.get("url_template")
+                },
+                "data": data
+            }, dumps=lambda obj: json.dumps(obj, ensure_ascii=False))
+        finally:
+            # A client that hangs up shouldn't leave pages running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.busy[session] -= 1
+            if not self.busy[session]:
+                del self.busy[session]
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok", "version": SCRIPT_VERSION, "pool": self.pool.status(), "sessions": len(self.sessions)})
+
+    def close_sessions(self):
+        for session in self.sessions.values():
+            session.close()
+        self.load_stats.save()
+
+async def serve(host: str, port: int, pool_size: int, schema_dir: str, options: RunOptions, max_sessions: int = DEFAULT_MAX_SESSIONS):
+    async with async_playwright() as p:
+        pool = BrowserPool(p, pool_size, options.get("browser_profile"))
+        await pool.start()
+        service = ScrapeService(pool, schema_dir, options, max_sessions)
+        app = web.Application()
+        app.router.add_post("/scrape", service.handle_scrape)
+        app.router.add_get("/health", service.handle_health)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Scrape service listening on http://{host}:{port}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+            service.close_sessions()
+            await pool.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve schemas over HTTP from a pool of warm browsers")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE, help="Browser contexts kept warm (pages run at once)")
+    parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS, help="Distinct schemas kept warm; the least recently used is closed past this")
+    parser.add_argument("--schema-dir", default=".", help="Where schemas requested by name are looked up")
+    parser.add_argument("--profile", choices=list(BROWSER_PROFILES), help="Browser profile (default: $BROWSER_PROFILE, else 'default')")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    options: RunOptions = {"browser_profile": args.profile}
+    try:
+        asyncio.run(serve(args.host, args.port, args.pool_size, args.schema_dir, options, args.max_sessions))
+    except KeyboardInterrupt:
+        logger.info("Scrape service stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any
+
+DEFAULT_SNAPSHOT_DIR = "snapshots"
+
+def snapshot_key(url: str) -> str:
+    """Stable file name for a URL's snapshot."""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+class SnapshotStore:
+    """Compressed store of rendered HTML plus the network log, one snapshot per URL."""
+
+    def __init__(self, root: str = DEFAULT_SNAPSHOT_DIR):
+        self.root = root
+
+    def path_for(self, url: str) -> str:
+        return os.path.join(self.root, f"{snapshot_key(url)}.json.gz")
+
+    def save(self, url: str, final_url: str, html: str, network_log: List[Dict[str, Any]]) -> str:
+        """Write (or replace) the snapshot for a URL and return its path."""
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path_for(url)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({
+                "url": url,
+                "final_url": final_url,
+                "captured_at": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                "html": html,
+                "network": network_log
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    def load(self, url: str) -> Optional[Dict[str, Any]]:
+        """Load the snapshot for a URL, or None if it was never captured."""
+        path = self.path_for(url)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
@@ -7,10 +7,35 @@ import re
 import base64
 import binascii
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Union, Any, TypedDict, Set
-from playwright.async_api import async_playwright, Page, BrowserContext, Request, Response
+from typing import Dict, List, Optional, Union, Any, TypedDict, Set, Tuple
+from playwright.async_api import async_playwright, Page, Frame, Browser, BrowserContext, Request, Response
 from urllib.parse import urljoin, urlparse, unquote
 import concurrent.futures
+import aiohttp
+import hashlib
+import argparse
+import os
+from blob_store import BlobStore, open_blob_store, DEFAULT_BLOB_DIR
+from snapshots import SnapshotStore, DEFAULT_SNAPSHOT_DIR, snapshot_key
+from circuit_breaker import HostCircuitBreakers
+from frontier import Frontier, follow_links, link_priority
+from load_strategy import LoadStats, LOAD_STATS_FILE, normalize_load_config, candidate_strategies, load_page, load_succeeded
+from mutation_capture import MutationCapture
+from story_pairing import pair_stories
+from resources import has_memory_headroom
+from browser_profiles import BROWSER_PROFILES, get_profile, launch_args
+from concurrency import AdaptiveConcurrency, concurrency_bounds
+from job_queue import JobQueue, Job, open_job_queue, worker_name, DEFAULT_VISIBILITY_TIMEOUT
+from output_backends import JsonlSink, open_output, structural_diff, OUTPUT_FORMATS
+from result_cache import open_result_cache, cache_max_age, schema_cache_id
+from feeds import FeedDiscovery, open_feed_http
+from schema_validator import validate_schema, schema_warnings, compile_record_validator
+from change_detection import open_fingerprint_store, is_unchanged, content_hash, DEFAULT_CONTENT_SELECTOR, FRESH, CARRIED_OVER
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:  # Only needed for offline extraction
+    HTMLParser = None
 
 logging.basicConfig(
     level=logging.INFO,
@@ -46,6 +71,13 @@ class PropertyConfig(TypedDict, total=False):
     pattern: Optional[str]
     filter: Optional[Dict[str, str]]
     process_base64: Optional[bool]
+    max_bytes: Optional[int]
+    overflow: Optional[str]  # "truncate" (default), "digest" or "blob"
+    depends_on: Optional[List[str]]
+    frame: Optional[Dict[str, Any]]
+    title_selector: Optional[str]  # "stories" properties: story title, text and image within each container
+    article_selector: Optional[str]
+    image_selector: Optional[str]
 
 class PostActionConfig(TypedDict, total=False):
     type: Optional[str]
@@ -55,11 +87,12 @@ class PostActionConfig(TypedDict, total=False):
     methods: Optional[List[str]]
     pattern: Optional[str]
     media_only: Optional[bool]
+    frame: Optional[Dict[str, Any]]
 
 class ScrapingSchema(TypedDict):
     url: Optional[str]
     url_template: Optional[str]
-    url_range: Optional[Dict[str, int]]
+    url_range: Optional[Dict[str, Any]]
     properties: Dict[str, PropertyConfig]
     actions: Optional[List[ActionConfig]]
     post_actions: Optional[Dict[str, PostActionConfig]]
@@ -68,6 +101,32 @@ class ScrapingSchema(TypedDict):
     enable_base64_decode: Optional[bool]
     scan_javascript: Optional[bool]
     max_page_scroll: Optional[int]
+    blob_store: Optional[str]
+    extraction_deadline: Optional[float]
+    load_strategy: Optional[Union[str, Dict[str, Any]]]
+    circuit_breaker: Optional[Dict[str, float]]
+    concurrency: Optional[Union[int, Dict[str, Any]]]
+    crawl: Optional[Dict[str, Any]]
+    mutation_capture: Optional[Dict[str, Any]]
+    prefetch: Optional[Union[int, Dict[str, Any]]]
+    response_capture: Optional[Dict[str, Any]]
+    static: Optional[Union[bool, Dict[str, Any]]]
+    cache: Optional[Dict[str, Any]]
+    change_detection: Optional[Union[bool, Dict[str, Any]]]
+    feeds: Optional[Union[bool, Dict[str, Any]]]
+
+class RunOptions(TypedDict, total=False):
+    snapshot_dir: Optional[str]
+    offline: bool
+    workers: Optional[int]
+    record_har: Optional[str]
+    replay_har: Optional[str]
+    wait_scale: float
+    load_stats_file: Optional[str]
+    browser_profile: Optional[str]
+    cache_file: Optional[str]
+    max_age: Optional[float]
+    validate: bool
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -77,16 +136,23 @@ USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:122.0) Gecko/20100101 Firefox/122.0"
 ]
 
+# Added on top of the browser profile's flags
 BROWSER_ARGS = [
-    '--disable-dev-shm-usage',
-    '--no-sandbox',
-    '--disable-gpu',
-    '--disable-software-rasterizer',
-    '--disable-extensions',
     '--disable-web-security',  # Added to capture more cross-origin requests
     '--autoplay-policy=no-user-gesture-required'  # Help with media detection
 ]
 
+# Server-rendered pages don't need scripts, a full-size layout or decoded images
+STATIC_BROWSER_ARGS = ['--blink-settings=imagesEnabled=false']
+STATIC_VIEWPORT = {'width': 800, 'height': 600}
+
+# Reports which selectors match nothing in the current DOM (invalid selectors are not reported)
+MISSING_SELECTORS_JS = """
+(selectors) => selectors.filter(selector => {
+    try { return !document.querySelector(selector); } catch (e) { return false; }
+})
+"""
+
 # Media patterns for detecting relevant URLs
 MEDIA_PATTERNS = {
     'm3u8': re.compile(r'\.m3u8(\?.*)?$', re.IGNORECASE),
@@ -113,15 +179,109 @@ JS_URL_PATTERNS = [
 # Combine patterns into one regex
 JS_URL_REGEX = re.compile('|'.join(JS_URL_PATTERNS), re.IGNORECASE)
 
-async def create_browser_context(playwright):
-    browser = await playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+# Seconds all properties on a page share for waiting on selectors, plus a grace period
+# for properties whose selectors appeared late to finish reading their elements
+PAGE_EXTRACTION_DEADLINE = 20
+EXTRACTION_GRACE_PERIOD = 5
+
+# How often to look for child frames that have not attached yet
+FRAME_POLL_INTERVAL = 0.25
+
+# Post-actions run on a page that has loaded and finished its actions, so frames
+# not attached by then get only a short wait rather than a fresh extraction deadline
+POST_ACTION_FRAME_TIMEOUT = 3
+
+# Prefetching stops opening spare tabs when the system has less memory than this free
+DEFAULT_PREFETCH_MIN_FREE_MB = 512
+
+# Statuses worth retrying (and counted against the host's circuit breaker), and
+# statuses that mean the page simply doesn't exist
+RETRYABLE_STATUSES = {408, 425, 429}
+DEAD_PAGE_STATUSES = {404, 410}
+
+# Response content types that identify media streams and manifests
+MEDIA_CONTENT_TYPES = ["video/", "application/x-mpegURL", "application/dash+xml"]
+
+# Response bodies kept by default when response_capture is enabled: manifests, not the segments
+CAPTURED_CONTENT_TYPES = ["application/x-mpegURL", "application/vnd.apple.mpegurl", "application/dash+xml"]
+DEFAULT_CAPTURED_BODY_BYTES = 2 * 1024 * 1024
+DEFAULT_CAPTURED_RESPONSES = 50
+# Besides text/*: content types whose bodies are text (JSON APIs, XML, playlists and manifests)
+TEXT_CONTENT_MARKERS = ["json", "xml", "javascript", "mpegurl"]
+
+# Reads a text value inside the page and applies the max_bytes policy there, so oversized
+# values (whole documents, minified bundles) never cross into Python unless they must
+READ_CAPPED_TEXT_JS = """
+async (element, [attribute, maxBytes, overflow]) => {
+    let text;
+    if (!attribute) text = element.innerText;
+    else if (attribute === 'innerHTML') text = element.innerHTML;
+    else if (attribute === 'outerHTML') text = element.outerHTML;
+    else text = element.getAttribute(attribute);
+    if (text === null || text === undefined) return null;
+
+    // UTF-8 length is between 1x and 3x the UTF-16 length, so only encode when it is ambiguous
+    let size = null;
+    if (text.length > maxBytes) size = Infinity;
+    else if (text.length * 3 <= maxBytes) size = text.length;
+    else size = new TextEncoder().encode(text).length;
+    if (size <= maxBytes) return {text: text};
+
+    if (overflow === 'digest') {
+        if (window.crypto && crypto.subtle) {
+            const bytes = new TextEncoder().encode(text);
+            const hash = await crypto.subtle.digest('SHA-256', bytes);
+            const hex = Array.from(new Uint8Array(hash)).map(b => b.toString(16).padStart(2, '0')).join('');
+            return {sha256: hex, bytes: bytes.length};
+        }
+        // crypto.subtle is unavailable on insecure origins; hash in Python instead
+        return {text: text, overflow: true};
+    }
+    if (overflow === 'blob') return {text: text, overflow: true};
+    return {text: text.slice(0, maxBytes), overflow: true};
+}
+"""
+
+async def create_browser_context(playwright, block_service_workers: bool = False, static: bool = False, profile_name: Optional[str] = None):
+    profile = get_profile(profile_name)
+    browser = await playwright.chromium.launch(headless=True, args=launch_args(profile, BROWSER_ARGS + (STATIC_BROWSER_ARGS if static else [])))
     context = await browser.new_context(
         user_agent=random.choice(USER_AGENTS),
-        viewport={'width': 1920, 'height': 1080},
-        ignore_https_errors=True
+        viewport=STATIC_VIEWPORT if static else profile["viewport"],
+        java_script_enabled=not static,
+        ignore_https_errors=True,
+        # Service worker traffic bypasses page routes, so it would escape HAR record/replay
+        service_workers='block' if block_service_workers else 'allow'
     )
     return context, browser
 
+def static_required_selectors(schema: ScrapingSchema) -> List[str]:
+    """Selectors a static-mode page must still contain: configured ones, else the properties' own."""
+    static = schema.get("static")
+    if isinstance(static, dict) and static.get("required_selectors"):
+        return list(static["required_selectors"])
+    return [
+        value["selector"] for value in schema["properties"].values()
+        if value.get("selector") and value.get("selector_type", "css") == "css" and "frame" not in value
+    ]
+
+def har_path_for(har_dir: str, url: str) -> str:
+    """HAR archive holding one URL's recorded traffic."""
+    return os.path.join(har_dir, f"{snapshot_key(url)}.har.zip")
+
+async def attach_har(page: Page, url: str, options: RunOptions):
+    """Record the page's traffic to a HAR, or serve it from one with no real network access."""
+    if options.get("record_har"):
+        os.makedirs(options["record_har"], exist_ok=True)
+        # The archive is written when the context closes
+        await page.route_from_har(har_path_for(options["record_har"], url), update=True, update_content="attach", update_mode="minimal")
+    elif options.get("replay_har"):
+        har_path = har_path_for(options["replay_har"], url)
+        if not os.path.exists(har_path):
+            raise ScrapingError(f"No HAR recorded for {url}")
+        # Requests missing from the HAR are aborted rather than sent to the network
+        await page.route_from_har(har_path, not_found="abort")
+
 def generate_urls_from_template(template: str, start: int, end: int) -> List[str]:
     """Generate a list of URLs from a template and a range of IDs."""
     return [template.format(id=id) for id in range(start, end + 1)]
@@ -163,7 +323,7 @@ def extract_urls_from_text(text: str, base_url: str = None) -> List[str]:
         if cleaned_url and cleaned_url.startswith(('http://', 'https://')):
             unique_urls.append(cleaned_url)
     
-    return list(set(unique_urls))
+    return list(dict.fromkeys(unique_urls))
 
 def try_decode_base64(text: str) -> Optional[str]:
     """Attempt to decode a potential base64 string and check if result is a URL."""
@@ -194,212 +354,962 @@ def try_decode_base64(text: str) -> Optional[str]:
     except (binascii.Error, UnicodeDecodeError):
         return None
 
-async def scrape_website(schema: ScrapingSchema):
-    start_time = datetime.now(timezone.utc)
-    urls = []
+def digest_text(text: str) -> Dict[str, Any]:
+    """Summarise a value by its SHA-256 and size instead of its content."""
+    raw = text.encode('utf-8')
+    return {"sha256": hashlib.sha256(raw).hexdigest(), "bytes": len(raw)}
+
+def apply_size_cap(text: Optional[str], value: PropertyConfig, schema: ScrapingSchema) -> Any:
+    """Apply a property's max_bytes/overflow policy to a value already in Python."""
+    if text is None or value.get("max_bytes") is None:
+        return text
+    max_bytes = value["max_bytes"]
+    raw = text.encode('utf-8')
+    if len(raw) <= max_bytes:
+        return text
+
+    overflow = value.get("overflow", "truncate")
+    if overflow == "digest":
+        return digest_text(text)
+    if overflow == "blob":
+        # Identical payloads (e.g. the same minified bundle on every page) are stored once
+        return open_blob_store(schema.get("blob_store", DEFAULT_BLOB_DIR)).put(raw)
+    return raw[:max_bytes].decode('utf-8', errors='ignore')
+
+def post_process_text(text: Optional[str], attribute: Optional[str], value: PropertyConfig, schema: ScrapingSchema, base_url: str) -> Optional[str]:
+    """Resolve URL attributes against the page and decode base64 when the property asks for it."""
+    if text and attribute in ["href", "src", "data-src", "data-url"]:
+        text = urljoin(base_url, text)
+    if text and value.get("process_base64", False) and schema.get("enable_base64_decode", False):
+        text = try_decode_base64(text) or text
+    return text
+
+async def read_capped_text(element, attribute: Optional[str], value: PropertyConfig, schema: ScrapingSchema, base_url: str, strip: bool = False) -> Any:
+    """Read an element's text/attribute with the property's size cap enforced in the page."""
+    result = await element.evaluate(
+        READ_CAPPED_TEXT_JS,
+        [attribute, value["max_bytes"], value.get("overflow", "truncate")]
+    )
+    if result is None:
+        return None
+    if "sha256" in result:
+        return result
+
+    # Same post-processing as uncapped reads; the cap is re-applied since resolving a URL can grow it
+    text = post_process_text(result["text"].strip() if strip else result["text"], attribute, value, schema, base_url)
+    return apply_size_cap(text, value, schema)
+
+def get_schema_urls(schema: ScrapingSchema) -> List[str]:
+    """Resolve the list of URLs a schema targets."""
     if "url_template" in schema and "url_range" in schema:
         # Generate URLs from template
-        urls = generate_urls_from_template(
+        return generate_urls_from_template(
             schema["url_template"],
             schema["url_range"]["start"],
             schema["url_range"]["end"]
         )
     elif "url" in schema:
         # Use single URL
-        urls = [schema["url"]]
-    else:
-        raise ScrapingError("No URL or URL template provided in schema.")
+        return [schema["url"]]
+    raise ScrapingError("No URL or URL template provided in schema.")
 
-    all_data = []
-    async with async_playwright() as p:
-        context, browser = await create_browser_context(p)
+def extract_network_requests(requests: List[Dict[str, Any]], config: PostActionConfig):
+    pattern = re.compile(config["pattern"], re.IGNORECASE)
+    methods = config.get("methods", ["GET", "POST"])
+    results = []
+    for req in requests:
+        if req["method"] in methods and pattern.search(req["url"]):
+            results.append(req["url"])
+    return list(dict.fromkeys(results)) if results else None
+
+def is_media_content_type(content_type: str) -> bool:
+    """Check if a response content-type is a media stream or manifest."""
+    return any(media_type in content_type for media_type in MEDIA_CONTENT_TYPES)
+
+def is_text_content_type(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return content_type.startswith("text/") or any(marker in content_type for marker in TEXT_CONTENT_MARKERS)
+
+def wants_response_body(url: str, content_type: str, config: Dict[str, Any]) -> bool:
+    """Whether a response matches the configured content types or URL pattern."""
+    content_types = config.get("content_types", CAPTURED_CONTENT_TYPES)
+    if any(wanted.lower() in content_type.lower() for wanted in content_types):
+        return True
+    return bool(config.get("url_pattern")) and re.search(config["url_pattern"], url, re.IGNORECASE) is not None
+
+async def capture_response_body(request: Request, config: Dict[str, Any], store: BlobStore) -> Optional[Dict[str, Any]]:
+    """Write a finished response's body to the blob store and describe it, if it should be kept."""
+    response = await request.response()
+    if response is None or not 200 <= response.status < 300:
+        return None
+    content_type = response.headers.get("content-type", "")
+    if not wants_response_body(response.url, content_type, config):
+        return None
+    record = {"url": response.url, "status": response.status, "content_type": content_type}
+    max_bytes = config.get("max_bytes", DEFAULT_CAPTURED_BODY_BYTES)
+    # Don't pull a body into memory at all when the server already says it is too big
+    length = response.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_bytes:
+        record["skipped"] = f"Content-Length {length} exceeds {max_bytes} bytes"
+        return record
+    # Playwright only hands over whole bodies, so one of unknown size is only read when it's text
+    # (manifests, JSON); a chunked binary response could be any size
+    if not length.isdigit() and not is_text_content_type(content_type):
+        record["skipped"] = f"no Content-Length on a {content_type or 'untyped'} body"
+        return record
+    body = await response.body()
+    record.update(await asyncio.to_thread(store.put_stream, [body], max_bytes))
+    return record
+
+def find_base64_urls(page_content: str, script_contents: str) -> Set[str]:
+    """Decode base64 payloads in page HTML and inline script variables that hide URLs."""
+    decoded_urls: Set[str] = set()
+    
+    # Find potential base64 strings
+    base64_pattern = re.compile(r'(?:base64,)([A-Za-z0-9+/=]{30,})')
+    for b64_str in base64_pattern.findall(page_content):
+        decoded = try_decode_base64(b64_str)
+        if decoded:
+            decoded_urls.add(decoded)
+    
+    # Look for patterns that might indicate base64 encoded URLs
+    potential_b64_vars = re.finditer(r'(?:var|let|const)\s+(\w+)\s*=\s*[\'"]([A-Za-z0-9+/=]{30,})[\'"]', script_contents)
+    for match in potential_b64_vars:
+        var_name, b64_str = match.groups()
+        decoded = try_decode_base64(b64_str)
+        if decoded:
+            decoded_urls.add(decoded)
+    
+    return decoded_urls
+
+class ScrapeSession:
+    """Run-wide state shared by every page scraped for one schema."""
+
+    def __init__(self, schema: ScrapingSchema, options: RunOptions, metrics: Optional[Dict[str, Any]] = None, load_stats: Optional[LoadStats] = None):
+        self.schema = schema
+        self.options = options
+        # Filled in as the run goes and reported in the output's metadata
+        self.metrics = metrics if metrics is not None else {}
+        self.snapshot_store = SnapshotStore(options["snapshot_dir"]) if options.get("snapshot_dir") else None
+        self.har_mode = bool(options.get("record_har") or options.get("replay_har"))
+        self.wait_scale = options.get("wait_scale", 1.0)
         
-        # Enable media capture if specified
-        media_urls: Set[str] = set()
-        hidden_links: Set[str] = set()
-        decoded_urls: Set[str] = set()
+        # Static pages run no scripts, so there is nothing to wait for past DOMContentLoaded
+        self.static = bool(schema.get("static"))
+        self.static_warned: Set[str] = set()
+        if self.static and schema.get("mutation_capture") is not None:
+            logger.warning("mutation_capture needs JavaScript and does nothing in static mode")
         
-        for url in urls:
-            logger.info(f"Starting scraping job for {url} at {start_time.strftime('%Y-%m-%d %H:%M:%S')} UTC")
-            page = await context.new_page()
+        # Navigation waits for networkidle unless the schema picks (or asks to learn) a cheaper strategy
+        self.load_config = normalize_load_config(schema.get("load_strategy"), default="domcontentloaded" if self.static else "networkidle")
+        self.load_config.setdefault("timeout", 60)
+        # Processes running several sessions share one LoadStats and save it themselves,
+        # so the last session to close doesn't overwrite the others' host timings
+        self.owns_load_stats = load_stats is None
+        self.load_stats = load_stats or LoadStats(options.get("load_stats_file") or LOAD_STATS_FILE)
+        
+        # Hosts that keep timing out or erroring are skipped until a probe succeeds
+        self.breakers = HostCircuitBreakers(**schema.get("circuit_breaker", {}))
+        
+        # Recent results for the same URL and schema are reused without opening a page
+        self.cache = open_result_cache(schema, options.get("cache_file"), options.get("max_age"))
+        self.cache_max_age = cache_max_age(schema, options.get("max_age"))
+        
+        # Pages whose content region hasn't changed since the last run reuse that run's record.
+        # The conditional request bypasses page routes, so HAR runs would answer it from (and
+        # leave out of) the live network instead of the recording
+        self.fingerprints = open_fingerprint_store(schema) if not self.har_mode else None
+        if self.har_mode and schema.get("change_detection"):
+            logger.info("change_detection is off while recording or replaying HARs")
+        change_config = schema.get("change_detection")
+        self.change_selector = change_config.get("selector", DEFAULT_CONTENT_SELECTOR) if isinstance(change_config, dict) else DEFAULT_CONTENT_SELECTOR
+        
+        # Listing pages whose headlines are also published as a feed or sitemap are read from that instead
+        # Feeds are fetched outside the browser, so HAR runs would neither record nor replay them
+        self.feeds = FeedDiscovery(schema["feeds"]) if schema.get("feeds") and not self.har_mode else None
+        if self.har_mode and schema.get("feeds"):
+            logger.info("feeds are off while recording or replaying HARs")
+        self.feed_results: Dict[str, Optional[Dict[str, Any]]] = {}  # url -> feed values, or None when no feed covered it
+    
+    def cached_result(self, url: str, schema: ScrapingSchema, count: bool = True) -> Optional[Dict[str, Any]]:
+        if not self.cache:
+            return None
+        return self.cache.get(url, schema_cache_id(schema), self.cache_max_age, count)
+    
+    def close(self):
+        if self.owns_load_stats:
+            self.load_stats.save()
+        if self.cache:
+            self.metrics["cache"] = self.cache.stats()
+            self.cache.close()
+        if self.fingerprints:
+            self.fingerprints.close()
+
+async def read_from_feeds(session: ScrapeSession, url: str, schema: ScrapingSchema, http: Optional[aiohttp.ClientSession] = None) -> Optional[Dict[str, Any]]:
+    """Values of the page's feed-filled properties (plus feed_url), checking each URL only once."""
+    if url in session.feed_results:
+        return session.feed_results.pop(url)
+    try:
+        if http is None:
+            async with open_feed_http(random.choice(USER_AGENTS)) as own_http:
+                data = await session.feeds.read(own_http, url, schema)
+        else:
+            data = await session.feeds.read(http, url, schema)
+    except Exception as e:
+        logger.warning(f"Feed discovery failed for {url}: {e}")
+        data = None
+    if data is not None:
+        logger.info(f"Read {', '.join(key for key in data if key != 'feed_url')} for {url} from feed {data['feed_url']}")
+    return data
+
+def feed_record(session: ScrapeSession, url: str, schema: ScrapingSchema, values: Dict[str, Any]) -> Dict[str, Any]:
+    """The record of a page whose every property a feed filled, so it never needed a browser."""
+    data = {key: None for key in schema["properties"]}
+    data.update(values)
+    if session.cache:
+        session.cache.put(url, schema_cache_id(schema), data)
+    return data
+
+async def prefill_from_feeds(session: ScrapeSession, urls: List[str]) -> bool:
+    """Try feeds for every page before any browser is launched; True if they covered them all."""
+    async with open_feed_http(random.choice(USER_AGENTS)) as http:
+        results = await asyncio.gather(*(read_from_feeds(session, url, session.schema, http) for url in urls))
+    session.feed_results.update(zip(urls, results))
+    return all(data is not None for data in results)
+
+def empty_result(schema: ScrapingSchema, error: str, **extra) -> Dict[str, Any]:
+    """Result record for a URL that produced nothing."""
+    error_data = {key: None for key in schema["properties"]}
+    error_data["error"] = error
+    error_data.update(extra)
+    return error_data
+
+def is_empty_result(data: Dict[str, Any], schema: ScrapingSchema) -> bool:
+    """A page is a miss if it failed or none of its properties found anything."""
+    if data.get("error"):
+        return True
+    return all(data.get(key) in (None, [], "") for key in schema["properties"])
+
+async def scrape_url(session: ScrapeSession, context: BrowserContext, url: str, schema: Optional[ScrapingSchema] = None, gate: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+    """Load one URL and run the schema's extraction, actions and post-actions on it.
+    
+    With a gate, the page loads right away but waits for a slot before it is processed,
+    so pages can be prefetched while others are still being worked on.
+    """
+    schema = schema or session.schema
+    loop = asyncio.get_running_loop()
+    host = urlparse(url).netloc
+    
+    cached = session.cached_result(url, schema)
+    if cached is not None:
+        logger.info(f"Using cached result for {url}")
+        if session.fingerprints:
+            cached["freshness"] = CARRIED_OVER
+        return cached
+    
+    if not session.breakers.allow(url):
+        logger.warning(f"Skipping {url}: circuit open for {host}")
+        return empty_result(schema, f"Circuit open for {host}", circuit_open=True)
+    
+    # Feeds stand in for the page only when they fill every property and nothing else needs
+    # rendering; otherwise their values are merged into the page's normal extraction
+    feed_values = None
+    if session.feeds:
+        feed_values = await read_from_feeds(session, url, schema)
+        if feed_values is not None and session.feeds.covers(schema):
+            # The host answered, so a half-open probe that ends here still closes the circuit
+            session.breakers.record(url, True)
+            return feed_record(session, url, schema, feed_values)
+    
+    # A plain conditional request is far cheaper than rendering; only changed pages get a browser tab
+    previous = session.fingerprints.get(url, schema_cache_id(schema)) if session.fingerprints else None
+    if previous:
+        try:
+            headers = await is_unchanged(context.request, url, previous, session.change_selector)
+        except Exception as e:
+            logger.warning(f"Change check failed for {url}, rendering it: {e}")
+            headers = None
+        if headers is not None:
+            logger.info(f"{url} unchanged since the last run, reusing its record")
+            session.fingerprints.touch(url, schema_cache_id(schema), headers)
+            session.breakers.record(url, True)
+            return {**previous["data"], **(feed_values or {}), "freshness": CARRIED_OVER}
+    
+    logger.info(f"Starting scraping job for {url} at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC")
+    page = await context.new_page()
+    
+    media_urls: Set[str] = set()
+    hidden_links: Set[str] = set()
+    decoded_urls: Set[str] = set()
+    
+    # Keep a per-page network log for network post-actions and snapshots
+    network_log: List[Dict[str, Any]] = []
+    log_entries: Dict[Request, Dict[str, Any]] = {}
+    
+    def log_request(request: Request):
+        entry = {"method": request.method, "url": request.url, "resource_type": request.resource_type}
+        log_entries[request] = entry
+        network_log.append(entry)
+    
+    def log_response(response: Response):
+        entry = log_entries.get(response.request)
+        if entry is not None:
+            entry["status"] = response.status
+            entry["content_type"] = response.headers.get("content-type", "")
+    
+    page.on("request", log_request)
+    page.on("response", log_response)
+    
+    # Add request/response handlers for media detection
+    if schema.get("enable_media_capture", False):
+        async def handle_request(request: Request):
+            if is_valid_media_url(request.url):
+                media_urls.add(request.url)
+        
+        async def handle_response(response: Response):
+            if is_valid_media_url(response.url):
+                media_urls.add(response.url)
+            # Check content-type for media types
+            if is_media_content_type(response.headers.get("content-type", "")):
+                media_urls.add(response.url)
+        
+        page.on("request", handle_request)
+        page.on("response", handle_response)
+    
+    # Keep bodies of matching responses, e.g. tokenized manifests that can't be fetched again later
+    body_config = schema.get("response_capture")
+    response_bodies: List[Dict[str, Any]] = []
+    body_tasks: Set[asyncio.Task] = set()
+    if body_config:
+        body_store = open_blob_store(schema.get("blob_store", DEFAULT_BLOB_DIR))
+        
+        max_responses = body_config.get("max_responses", DEFAULT_CAPTURED_RESPONSES)
+        body_slots = 0  # taken before awaiting, so bodies finishing together can't overshoot max_responses
+        
+        async def handle_finished(request: Request):
+            nonlocal body_slots
+            try:
+                record = await capture_response_body(request, body_config, body_store)
+            except Exception as body_err:
+                logger.warning(f"Could not capture body of {request.url}: {body_err}")
+                record = None
+            if not record:
+                body_slots -= 1
+                return
+            response_bodies.append(record)
+            entry = log_entries.get(request)
+            if entry is not None and "blob" in record:
+                entry["body"] = {"blob": record["blob"], "bytes": record["bytes"]}
+        
+        def on_request_finished(request: Request):
+            nonlocal body_slots
+            if body_slots >= max_responses:
+                return
+            body_slots += 1
+            task = asyncio.create_task(handle_finished(request))
+            body_tasks.add(task)
+            task.add_done_callback(body_tasks.discard)
+        
+        page.on("requestfinished", on_request_finished)
+    
+    acquired = False
+    try:
+        capture = await install_mutation_capture(page, schema)
+        
+        if session.har_mode:
+            await attach_har(page, url, session.options)
+        
+        page.set_default_timeout(60000)
+        load_config = session.load_config
+        failed_strategies: List[str] = []
+        load_strategy, load_elapsed, status = None, None, None
+        main_response = None
+        # The breaker hears once per URL, after the retries: one flaky page retried three
+        # times is one failure, not enough on its own to shut out the whole host
+        host_ok = False
+        for attempt in range(3):
+            if attempt and session.breakers.is_open(url):
+                logger.warning(f"Circuit opened for {host}, not retrying {url}")
+                break
+            if load_config["type"] == "auto":
+                strategy = session.load_stats.choose(host, candidate_strategies(load_config), exclude=failed_strategies)
+            else:
+                strategy = load_config["type"]
+            try:
+                load_start = loop.time()
+                response = await load_page(page, url, strategy, load_config)
+                main_response = response
+                status = response.status if response else None
+                if response and response.ok:
+                    load_strategy, load_elapsed = strategy, loop.time() - load_start
+                    host_ok = True
+                    break
+                # An error page isn't a load that worked, whichever strategy fetched it
+                session.load_stats.record(host, strategy, None, False)
+                logger.warning(f"Page loaded with status: {status}")
+                if status and 400 <= status < 500 and status not in RETRYABLE_STATUSES:
+                    # The host answered, the page just doesn't exist; retrying won't change that
+                    host_ok = True
+                    break
+                if attempt == 2:  # Still try to extract what we can
+                    break
+            except Exception as e:
+                # Let "auto" fall back to the next strategy on the retry
+                session.load_stats.record(host, strategy, None, False)
+                failed_strategies.append(strategy)
+                if attempt == 2:
+                    logger.error(f"Failed after 3 attempts: {str(e)}")
+                    break  # Continue with extraction despite failure
+                logger.warning(f"Attempt {attempt + 1} failed, retrying...")
+                await asyncio.sleep(2 ** attempt)
+        session.breakers.record(url, host_ok)
+        
+        if status in DEAD_PAGE_STATUSES:
+            return empty_result(schema, f"HTTP {status}", status=status)
+        
+        if gate:
+            await gate.acquire()
+            acquired = True
+        
+        if session.static and status and status < 400:
+            await check_static_selectors(session, page, schema)
+        
+        await scroll_page(page, schema, session.static, session.wait_scale)
+        
+        # Extract data based on the schema
+        data = await extract_data(page, schema, feed_values)
+        if feed_values:
+            data["feed_url"] = feed_values["feed_url"]
+        
+        await run_actions(page, schema, session.wait_scale, capture)
+        
+        # Extract hidden links from JavaScript if enabled
+        if schema.get("enable_hidden_links", False):
+            js_content = await page.evaluate("""
+                () => {
+                    const scripts = Array.from(document.querySelectorAll('script:not([src])'));
+                    return scripts.map(script => script.innerText).join('\\n');
+                }
+            """)
+            extracted_urls = extract_urls_from_text(js_content, url)
+            for extracted_url in extracted_urls:
+                hidden_links.add(extracted_url)
+        
+        # Scan all JavaScript sources for media URLs
+        if schema.get("scan_javascript", False):
+            script_srcs = await page.evaluate("""
+                () => {
+                    const scriptTags = Array.from(document.querySelectorAll('script[src]'));
+                    return scriptTags.map(script => script.src);
+                }
+            """)
+            for script_src in script_srcs:
+                try:
+                    if session.har_mode:
+                        # Fetch through the page so the script is recorded to / served from the HAR
+                        script_content = await page.evaluate("(src) => fetch(src).then(r => r.ok ? r.text() : null)", script_src)
+                    else:
+                        script_content_response = await page.request.get(script_src)
+                        script_content = await script_content_response.text() if script_content_response.ok else None
+                    if script_content:
+                        extracted_urls = extract_urls_from_text(script_content, url)
+                        for extracted_url in extracted_urls:
+                            if is_valid_media_url(extracted_url):
+                                media_urls.add(extracted_url)
+                            hidden_links.add(extracted_url)
+                except Exception as script_err:
+                    logger.warning(f"Error fetching script {script_src}: {script_err}")
+        
+        # Process base64 encoded content if enabled
+        if schema.get("enable_base64_decode", False):
+            # Look for base64 encoded strings in HTML and inline scripts
+            page_content = await page.content()
+            script_contents = await page.evaluate("""
+                () => {
+                    const scripts = Array.from(document.querySelectorAll('script:not([src])'));
+                    return scripts.map(script => script.innerText).join('\\n');
+                }
+            """)
+            for decoded in find_base64_urls(page_content, script_contents):
+                decoded_urls.add(decoded)
+                # Check if decoded content contains media URLs
+                media_in_decoded = [u for u in extract_urls_from_text(decoded) if is_valid_media_url(u)]
+                for media_url in media_in_decoded:
+                    media_urls.add(media_url)
+        
+        # Bodies must be read before the page closes
+        if body_tasks:
+            await asyncio.gather(*list(body_tasks), return_exceptions=True)
+        
+        # Save the rendered page and its network log so the schema can be re-run offline
+        if session.snapshot_store:
+            session.snapshot_store.save(url, page.url, await page.content(), network_log)
+        
+        # Process post-actions
+        if "post_actions" in schema:
+            # Frame-scoped post-actions share one short frame wait, within the schema's deadline
+            frame_deadline = loop.time() + min(POST_ACTION_FRAME_TIMEOUT, schema.get("extraction_deadline", PAGE_EXTRACTION_DEADLINE))
+            for key, config in schema["post_actions"].items():
+                if config.get("type") == "network":
+                    # Only include media URLs if media_only is True
+                    if config.get("media_only", False):
+                        data[key] = [url for url in media_urls if re.search(config.get("pattern", ""), url)]
+                    else:
+                        data[key] = extract_network_requests(network_log, config)
+                elif config.get("type") == "mutations":
+                    data[key] = capture.captured(config.get("pattern")) if capture else None
+                elif "frame" in config:
+                    data[key] = await extract_frame_post_action(page, config, frame_deadline)
+                else:
+                    data[key] = await extract_post_action(page, config)
+        
+        # Add collected media URLs to data
+        if schema.get("enable_media_capture", False):
+            data["media_urls"] = sorted(media_urls)
+        
+        # Add collected hidden links to data
+        if schema.get("enable_hidden_links", False):
+            data["hidden_links"] = sorted(hidden_links)
+        
+        # Add references to the captured response bodies
+        if body_config:
+            data["response_bodies"] = response_bodies
+        
+        # Add URLs the mutation observer saw injected into the DOM
+        if capture:
+            data["mutation_urls"] = capture.captured()
+        
+        # Add decoded base64 URLs to data
+        if schema.get("enable_base64_decode", False):
+            data["decoded_urls"] = sorted(decoded_urls)
+        
+        # A strategy only counts as having worked if the page yielded what the schema is after
+        if load_strategy:
+            session.load_stats.record(host, load_strategy, load_elapsed, load_succeeded(data, schema, load_config))
+            logger.info(f"Loaded {url} with '{load_strategy}' in {load_elapsed:.2f}s")
+        
+        if session.fingerprints and main_response and main_response.ok:
+            # Fingerprint the server's HTML (not the rendered DOM) so the next run's cheap check is comparable
+            try:
+                digest = content_hash(await main_response.text(), session.change_selector)
+                session.fingerprints.put(url, schema_cache_id(schema), main_response.headers, digest, data)
+            except Exception as e:
+                logger.warning(f"Could not fingerprint {url}: {e}")
+            data["freshness"] = FRESH
+        
+        if session.cache and not data.get("error"):
+            session.cache.put(url, schema_cache_id(schema), data)
+        
+        return data
+        
+    except Exception as e:
+        logger.error(f"Error during scraping for {url}: {str(e)}", exc_info=True)
+        # Add empty data structure with error information
+        return empty_result(schema, str(e))
+    finally:
+        if acquired:
+            gate.release()
+        await page.close()
+
+async def install_mutation_capture(page: Page, schema: ScrapingSchema) -> Optional[MutationCapture]:
+    """Register the schema's mutation observer; it has to be in place before navigation to see injected elements."""
+    if schema.get("mutation_capture") is None:
+        return None
+    capture = MutationCapture(schema["mutation_capture"])
+    await capture.install(page)
+    return capture
+
+async def scroll_page(page: Page, schema: ScrapingSchema, static: bool, wait_scale: float):
+    """Auto-scroll to trigger lazy-loaded content (which needs scripts to run)."""
+    max_scroll = 0 if static else schema.get("max_page_scroll", 3)
+    for scroll in range(max_scroll):
+        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        await asyncio.sleep(1 * wait_scale)  # Wait for content to load
+
+async def run_actions(page: Page, schema: ScrapingSchema, wait_scale: float, capture: Optional[MutationCapture]):
+    """Perform the schema's actions (clicks, waits, etc.), letting new media load after each."""
+    for action in schema.get("actions", []):
+        await perform_action(page, action, wait_scale, capture.stop_event() if capture else None)
+        if capture:
+            await capture.settle(wait_scale)
+        else:
+            await asyncio.sleep(2 * wait_scale)
+
+async def check_static_selectors(session: ScrapeSession, page: Page, schema: ScrapingSchema):
+    """Warn (once per selector) when a selector matches nothing with JavaScript disabled."""
+    missing = await page.evaluate(MISSING_SELECTORS_JS, static_required_selectors(schema))
+    new = [selector for selector in missing if selector not in session.static_warned]
+    if new:
+        session.static_warned.update(new)
+        logger.warning(
+            f"Static mode: {', '.join(repr(s) for s in new)} matched nothing on {page.url}; "
+            "the page may render them with JavaScript (set \"static\": false)"
+        )
+
+async def scrape_frontier(session: ScrapeSession, context: BrowserContext) -> List[Dict[str, Any]]:
+    """Drain the URL frontier with concurrent page workers, following links when the schema crawls."""
+    schema = session.schema
+    crawl = schema.get("crawl") or {}
+    frontier = Frontier(
+        max_depth=crawl.get("max_depth", 1) if crawl else 0,
+        max_pages=crawl.get("max_pages"),
+        delay=crawl.get("delay", 1.0) if crawl else 0.0,
+        seen_capacity=crawl.get("seen_capacity", 100000)
+    )
+    for url in get_schema_urls(schema):
+        frontier.push(url)
+    
+    # Followed pages may need their own properties (e.g. articles linked from a section page)
+    follow_schema = schema
+    if "properties" in crawl:
+        follow_schema = {
+            **schema,
+            "properties": crawl["properties"],
+            "actions": crawl.get("actions", []),
+            "post_actions": crawl.get("post_actions", {})
+        }
+    
+    results: Dict[int, Dict[str, Any]] = {}
+    # Workers beyond the controller's current limit wait for a slot
+    controller = AdaptiveConcurrency(schema.get("concurrency"), session.metrics)
+    loop = asyncio.get_running_loop()
+    
+    async def worker():
+        while True:
+            await controller.acquire()
+            try:
+                entry = await frontier.get()
+                if entry is None:
+                    return
+                page_schema = schema if entry.depth == 0 else follow_schema
+                started = loop.time()
+                try:
+                    data = await scrape_url(session, context, entry.url, page_schema)
+                    if crawl:
+                        for link in follow_links(data, crawl):
+                            frontier.push(link, entry.depth + 1, link_priority(link, entry.depth + 1, crawl))
+                except Exception as e:
+                    logger.error(f"Worker failed on {entry.url}: {str(e)}", exc_info=True)
+                    data = empty_result(page_schema, str(e))
+                finally:
+                    frontier.task_done()
+                controller.record(loop.time() - started, not data.get("error"))
+            finally:
+                await controller.release()
+            if crawl:
+                data["url"], data["depth"] = entry.url, entry.depth
+            results[entry.sequence] = data
+    
+    controller.start()
+    try:
+        await asyncio.gather(*(worker() for _ in range(controller.max)))
+    finally:
+        await controller.stop()
+    if crawl:
+        logger.info(f"Crawl visited {len(results)} pages ({frontier.accepted} URLs accepted into the frontier)")
+    # Report pages in the order they were discovered, not the order they finished
+    return [results[sequence] for sequence in sorted(results)]
+
+async def scrape_range(session: ScrapeSession, context: BrowserContext) -> List[Dict[str, Any]]:
+    """Walk a url_range, stopping or skipping ahead once ids keep coming back empty."""
+    schema = session.schema
+    url_range = schema["url_range"]
+    if url_range.get("search") == "boundary":
+        return await scrape_range_boundary(session, context)
+    
+    max_misses = url_range.get("max_misses")
+    prefetch = schema.get("prefetch") or {}
+    if isinstance(prefetch, int):
+        prefetch = {"lookahead": prefetch}
+    lookahead = prefetch.get("lookahead", 0)
+    min_free_mb = prefetch.get("min_free_mb", DEFAULT_PREFETCH_MIN_FREE_MB)
+    # Prefetched pages load in spare tabs but are processed no more than `concurrency` at a time
+    gate = asyncio.Semaphore(max(1, concurrency_bounds(schema.get("concurrency"))["initial"]))
+    pending: Dict[int, asyncio.Task] = {}
+    
+    def launch(id: int):
+        if id not in pending:
+            pending[id] = asyncio.create_task(scrape_url(session, context, schema["url_template"].format(id=id), gate=gate))
+    
+    all_data = []
+    misses = 0
+    circuit_skips = 0
+    id = url_range["start"]
+    try:
+        while id <= url_range["end"]:
+            launch(id)
+            for ahead in range(id + 1, min(id + lookahead, url_range["end"]) + 1):
+                if ahead in pending:
+                    continue
+                if not has_memory_headroom(min_free_mb):
+                    logger.info(f"Less than {min_free_mb}MB of memory free, not prefetching past id {ahead - 1}")
+                    break
+                launch(ahead)
             
-            # Add request/response handlers for media detection
-            if schema.get("enable_media_capture", False):
-                async def handle_request(request: Request):
-                    if is_valid_media_url(request.url):
-                        media_urls.add(request.url)
-                
-                async def handle_response(response: Response):
-                    if is_valid_media_url(response.url):
-                        media_urls.add(response.url)
-                    # Check content-type for media types
-                    content_type = response.headers.get("content-type", "")
-                    if any(media_type in content_type for media_type in ["video/", "application/x-mpegURL", "application/dash+xml"]):
-                        media_urls.add(response.url)
-                
-                page.on("request", handle_request)
-                page.on("response", handle_response)
+            data = await pending.pop(id)
+            data["url"] = schema["url_template"].format(id=id)
+            all_data.append(data)
+            if data.get("circuit_open"):
+                # Never loaded, so it says nothing about whether the id exists
+                circuit_skips += 1
+            else:
+                misses = misses + 1 if is_empty_result(data, schema) else 0
             
-            try:
-                page.set_default_timeout(60000)
-                for attempt in range(3):
-                    try:
-                        response = await page.goto(url, wait_until='networkidle')
-                        if not response or not response.ok:
-                            logger.warning(f"Page loaded with status: {response.status}")
-                            if attempt == 2:  # Still try to extract what we can
-                                break
-                        else:
-                            break
-                    except Exception as e:
-                        if attempt == 2:
-                            logger.error(f"Failed after 3 attempts: {str(e)}")
-                            break  # Continue with extraction despite failure
-                        logger.warning(f"Attempt {attempt + 1} failed, retrying...")
-                        await asyncio.sleep(2 ** attempt)
-                
-                # Perform auto-scrolling to trigger lazy-loaded content
-                max_scroll = schema.get("max_page_scroll", 3)
-                for scroll in range(max_scroll):
-                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    await asyncio.sleep(1)  # Wait for content to load
-                
-                # Extract data based on the schema
-                data = await extract_data(page, schema)
-                
-                # Handle actions (clicks, waits, etc.)
-                if "actions" in schema:
-                    for action in schema["actions"]:
-                        await perform_action(page, action)
-                        # Wait for any new media to load after action
-                        await asyncio.sleep(2)
-                
-                # Extract hidden links from JavaScript if enabled
-                if schema.get("enable_hidden_links", False):
-                    js_content = await page.evaluate("""
-                        () => {
-                            const scripts = Array.from(document.querySelectorAll('script:not([src])'));
-                            return scripts.map(script => script.innerText).join('\\n');
-                        }
-                    """)
-                    extracted_urls = extract_urls_from_text(js_content, url)
-                    for extracted_url in extracted_urls:
-                        hidden_links.add(extracted_url)
-                
-                # Scan all JavaScript sources for media URLs
-                if schema.get("scan_javascript", False):
-                    script_srcs = await page.evaluate("""
-                        () => {
-                            const scriptTags = Array.from(document.querySelectorAll('script[src]'));
-                            return scriptTags.map(script => script.src);
-                        }
-                    """)
-                    for script_src in script_srcs:
-                        try:
-                            script_content_response = await page.request.get(script_src)
-                            if script_content_response.ok:
-                                script_content = await script_content_response.text()
-                                extracted_urls = extract_urls_from_text(script_content, url)
-                                for extracted_url in extracted_urls:
-                                    if is_valid_media_url(extracted_url):
-                                        media_urls.add(extracted_url)
-                                    hidden_links.add(extracted_url)
-                        except Exception as script_err:
-                            logger.warning(f"Error fetching script {script_src}: {script_err}")
-                
-                # Process base64 encoded content if enabled
-                if schema.get("enable_base64_decode", False):
-                    # Look for base64 encoded strings in HTML and JS
-                    base64_pattern = re.compile(r'(?:base64,)([A-Za-z0-9+/=]{30,})')
-                    page_content = await page.content()
-                    
-                    # Find potential base64 strings
-                    base64_matches = base64_pattern.findall(page_content)
-                    for b64_str in base64_matches:
-                        decoded = try_decode_base64(b64_str)
-                        if decoded:
-                            decoded_urls.add(decoded)
-                            # Check if decoded content contains media URLs
-                            media_in_decoded = [u for u in extract_urls_from_text(decoded) if is_valid_media_url(u)]
-                            for media_url in media_in_decoded:
-                                media_urls.add(media_url)
-                    
-                    # Also check script tags for potential encoded URLs
-                    script_contents = await page.evaluate("""
-                        () => {
-                            const scripts = Array.from(document.querySelectorAll('script:not([src])'));
-                            return scripts.map(script => script.innerText).join('\\n');
-                        }
-                    """)
-                    
-                    # Look for patterns that might indicate base64 encoded URLs
-                    potential_b64_vars = re.finditer(r'(?:var|let|const)\s+(\w+)\s*=\s*[\'"]([A-Za-z0-9+/=]{30,})[\'"]', script_contents)
-                    for match in potential_b64_vars:
-                        var_name, b64_str = match.groups()
-                        decoded = try_decode_base64(b64_str)
-                        if decoded:
-                            decoded_urls.add(decoded)
-                            # Check if decoded content contains media URLs
-                            media_in_decoded = [u for u in extract_urls_from_text(decoded) if is_valid_media_url(u)]
-                            for media_url in media_in_decoded:
-                                media_urls.add(media_url)
-                
-                # Process post-actions
-                if "post_actions" in schema:
-                    for key, config in schema["post_actions"].items():
-                        if config.get("type") == "network":
-                            # Only include media URLs if media_only is True
-                            if config.get("media_only", False):
-                                data[key] = [url for url in media_urls if re.search(config.get("pattern", ""), url)]
-                            else:
-                                # Use original network request extraction
-                                pass  # This would use the original network request extraction
-                        else:
-                            data[key] = await extract_post_action(page, config)
-                
-                # Add collected media URLs to data
-                if schema.get("enable_media_capture", False):
-                    data["media_urls"] = list(media_urls)
-                
-                # Add collected hidden links to data
-                if schema.get("enable_hidden_links", False):
-                    data["hidden_links"] = list(hidden_links)
-                
-                # Add decoded base64 URLs to data
-                if schema.get("enable_base64_decode", False):
-                    data["decoded_urls"] = list(decoded_urls)
+            if max_misses and misses >= max_misses:
+                if url_range.get("on_misses", "stop") == "skip":
+                    skip = url_range.get("skip", max_misses)
+                    logger.info(f"{misses} consecutive empty ids up to {id}, skipping ahead {skip}")
+                    id += skip
+                    misses = 0
+                    for skipped in [p for p in pending if p <= id]:
+                        pending.pop(skipped).cancel()
+                else:
+                    logger.info(f"{misses} consecutive empty ids up to {id}, stopping the range early")
+                    break
+            id += 1
+    finally:
+        # Prefetched pages past an early stop are abandoned; let them close their tabs
+        for task in pending.values():
+            task.cancel()
+        await asyncio.gather(*pending.values(), return_exceptions=True)
+    if circuit_skips:
+        logger.warning(f"{circuit_skips} ids skipped while the host's circuit was open (not counted as misses)")
+        session.metrics["circuit_skipped"] = circuit_skips
+    return all_data
+
+async def scrape_range_boundary(session: ScrapeSession, context: BrowserContext) -> List[Dict[str, Any]]:
+    """Find the last live id with exponential then binary search, and scrape only the live ids."""
+    schema = session.schema
+    start, end = schema["url_range"]["start"], schema["url_range"]["end"]
+    results: Dict[int, Dict[str, Any]] = {}
+    
+    async def is_live(id: int) -> bool:
+        if id not in results:
+            url = schema["url_template"].format(id=id)
+            results[id] = {**await scrape_url(session, context, url), "url": url}
+        return not is_empty_result(results[id], schema)
+    
+    if not await is_live(start):
+        logger.info(f"First id {start} is empty, nothing to scan")
+        return [results[start]]
+    
+    # Gallop forward until an empty id brackets the boundary
+    last_live, first_dead, step = start, None, 1
+    while last_live < end:
+        probe = min(start + step, end)
+        if await is_live(probe):
+            last_live = probe
+            step *= 2
+        else:
+            first_dead = probe
+            break
+    
+    # Binary search the bracket for the last live id
+    if first_dead is not None:
+        while first_dead - last_live > 1:
+            middle = (last_live + first_dead) // 2
+            if await is_live(middle):
+                last_live = middle
+            else:
+                first_dead = middle
+    logger.info(f"Live ids end at {last_live} (found with {len(results)} probes)")
+    
+    for id in range(start, last_live + 1):
+        await is_live(id)
+    return [results[id] for id in range(start, last_live + 1)]
+
+async def scrape_website(schema: ScrapingSchema, options: Optional[RunOptions] = None, metrics: Optional[Dict[str, Any]] = None):
+    start_time = datetime.now(timezone.utc)
+    options = options or {}
+    session = ScrapeSession(schema, options, metrics)
+    
+    all_data = None
+    # A run whose every page is cached never needs a browser (crawls can't know their pages up front)
+    if session.cache and not schema.get("crawl"):
+        urls = get_schema_urls(schema)
+        if all(session.cached_result(url, schema, count=False) is not None for url in urls):
+            logger.info(f"All {len(urls)} pages cached, skipping the browser")
+            all_data = [session.cached_result(url, schema) for url in urls]
+    
+    if all_data is None:
+        async with async_playwright() as p:
+            # Feeds only need plain HTTP, so when they cover every page the browser is never launched
+            urls = get_schema_urls(schema) if session.feeds and session.feeds.covers(schema) and not schema.get("crawl") else None
+            if urls and await prefill_from_feeds(session, urls):
+                logger.info(f"Feeds covered all {len(urls)} pages, skipping the browser")
+                all_data = [feed_record(session, url, schema, session.feed_results.pop(url)) for url in urls]
+            else:
+                context, browser = await create_browser_context(
+                    p,
+                    block_service_workers=session.har_mode,
+                    static=session.static,
+                    profile_name=options.get("browser_profile")
+                )
                 
-                all_data.append(data)
+                if "url_template" in schema and "url_range" in schema:
+                    all_data = await scrape_range(session, context)
+                else:
+                    all_data = await scrape_frontier(session, context)
                 
-            except Exception as e:
-                logger.error(f"Error during scraping for {url}: {str(e)}", exc_info=True)
-                # Add empty data structure with error information
-                error_data = {key: None for key in schema["properties"]}
-                error_data["error"] = str(e)
-                all_data.append(error_data)
-            finally:
-                await page.close()
-        
-        await context.close()
-        await browser.close()
+                await context.close()
+                await browser.close()
     
+    session.close()
     end_time = datetime.now(timezone.utc)
     duration = (end_time - start_time).total_seconds()
+    session.metrics.update({"pages": len(all_data), "duration_seconds": round(duration, 2)})
     logger.info(f"Scraping completed in {duration:.2f} seconds")
     return all_data
 
-async def extract_data(page: Page, schema: ScrapingSchema):
+def property_dependencies(properties: Dict[str, PropertyConfig]) -> Dict[str, List[str]]:
+    """Each property's depends_on, without unknown names or the edges that would close a cycle."""
+    resolved: Dict[str, List[str]] = {}
+    visiting: Set[str] = set()
+    
+    def visit(key: str):
+        visiting.add(key)
+        resolved[key] = []
+        for dep in properties[key].get("depends_on", []):
+            if dep not in properties:
+                logger.warning(f"{key} depends on unknown property {dep}, ignoring it")
+            elif dep in visiting:
+                # Waiting on it would leave the whole cycle stuck until the page deadline
+                logger.warning(f"depends_on cycle through {key} -> {dep}; running {key} without waiting for {dep}")
+            else:
+                if dep not in resolved:
+                    visit(dep)
+                resolved[key].append(dep)
+        visiting.discard(key)
+    
+    for key in properties:
+        if key not in resolved:
+            visit(key)
+    return resolved
+
+async def extract_data(page: Page, schema: ScrapingSchema, prefilled: Optional[Dict[str, Any]] = None):
+    """Extract every property, reusing values already known (e.g. read from a feed) instead of querying the page."""
     data = {key: None for key in schema["properties"]}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + schema.get("extraction_deadline", PAGE_EXTRACTION_DEADLINE)
+    tasks: Dict[str, asyncio.Task] = {}
+    graph = property_dependencies(schema["properties"])
+    
+    async def extract(key: str, value: PropertyConfig):
+        # Properties run concurrently unless they name others they must follow
+        dependencies = [tasks[dep] for dep in graph[key]]
+        if dependencies:
+            await asyncio.wait(dependencies)
+        return await extract_property(page, key, value, schema, deadline)
+    
     for key, value in schema["properties"].items():
-        try:
-            data[key] = await extract_property(page, key, value, schema)
-        except Exception as e:
-            logger.error(f"Error extracting {key}: {str(e)}")
-            data[key] = None
+        if prefilled and key in prefilled:
+            # Already-finished, so properties depending on it don't wait
+            tasks[key] = loop.create_future()
+            tasks[key].set_result(prefilled[key])
+        else:
+            tasks[key] = asyncio.ensure_future(extract(key, value))
+    
+    if not tasks:
+        return data
+    
+    # Missing selectors all give up at the same deadline instead of adding up
+    done, pending = await asyncio.wait(tasks.values(), timeout=max(0, deadline - loop.time()) + EXTRACTION_GRACE_PERIOD)
+    for task in pending:
+        task.cancel()
+    
+    for key, task in tasks.items():
+        if task in pending:
+            logger.warning(f"Extraction of {key} exceeded the page deadline")
+        elif task.exception():
+            logger.error(f"Error extracting {key}: {str(task.exception())}")
+        else:
+            data[key] = task.result()
     return data
 
-async def extract_property(page: Page, key: str, value: PropertyConfig, schema: ScrapingSchema):
+async def wait_for_selector_until(page: Page, selector: str, deadline: Optional[float]):
+    """Wait for a selector to attach, giving up at the page-level extraction deadline."""
+    if deadline is None:
+        timeout = PAGE_EXTRACTION_DEADLINE
+    else:
+        timeout = deadline - asyncio.get_running_loop().time()
+    if timeout <= 0:
+        return
+    try:
+        await page.wait_for_selector(selector, state="attached", timeout=timeout * 1000)
+    except Exception:
+        pass  # Missing selectors just produce empty results
+
+def frame_depth(frame: Frame) -> int:
+    depth = 0
+    while frame.parent_frame:
+        depth += 1
+        frame = frame.parent_frame
+    return depth
+
+def frame_matches(frame: Frame, config: Dict[str, Any]) -> bool:
+    """Check a frame against a frame scope: url_pattern, and depth or min_depth/max_depth."""
+    if frame.is_detached():
+        return False
+    if config.get("url_pattern") and not re.search(config["url_pattern"], frame.url, re.IGNORECASE):
+        return False
+    depth = frame_depth(frame)
+    if "depth" in config:
+        return depth == config["depth"]
+    # Child frames only, unless the scope asks for the main frame too
+    return config.get("min_depth", 1) <= depth <= config.get("max_depth", depth)
+
+async def run_in_frames(page: Page, config: Dict[str, Any], deadline: float, extract) -> List[Any]:
+    """Run an extraction concurrently in every frame of the loaded page that matches a frame scope."""
+    loop = asyncio.get_running_loop()
+    # Nested players often attach their frames late, so wait (up to the deadline) for a match
+    frames = [frame for frame in page.frames if frame_matches(frame, config)]
+    while not frames and loop.time() < deadline:
+        await asyncio.sleep(FRAME_POLL_INTERVAL)
+        frames = [frame for frame in page.frames if frame_matches(frame, config)]
+    
+    async def run(frame: Frame):
+        try:
+            await frame.wait_for_load_state("domcontentloaded", timeout=max(1, deadline - loop.time()) * 1000)
+        except Exception:
+            pass  # Extract whatever the frame has so far
+        return await extract(frame)
+    
+    return list(await asyncio.gather(*(run(frame) for frame in frames)))
+
+def merge_frame_results(results: List[Any], dedupe: bool) -> List[Any]:
+    """Flatten per-frame results into one list, dropping frames that found nothing."""
+    merged = []
+    for result in results:
+        if result in (None, [], ""):
+            continue
+        if isinstance(result, list):
+            merged.extend(result)
+        else:
+            merged.append(result)
+    return list(dict.fromkeys(merged)) if dedupe else merged
+
+async def extract_frame_property(page: Page, key: str, value: PropertyConfig, schema: ScrapingSchema, deadline: Optional[float]):
+    """Evaluate a frame-scoped property inside the page's child frames, without navigating to them."""
+    if deadline is None:
+        deadline = asyncio.get_running_loop().time() + PAGE_EXTRACTION_DEADLINE
+    in_frame = {k: v for k, v in value.items() if k != "frame"}
+    results = await run_in_frames(
+        page, value["frame"], deadline,
+        lambda frame: extract_property(frame, key, in_frame, schema, deadline)
+    )
+    # One value per matching frame, so string properties come back as a list too
+    return merge_frame_results(results, dedupe=value["type"] == "regex")
+
+async def extract_frame_post_action(page: Page, config: PostActionConfig, deadline: float):
+    """Run a selector post-action inside the page's child frames."""
+    results = await run_in_frames(page, config["frame"], deadline, lambda frame: extract_post_action(frame, config))
+    return merge_frame_results(results, dedupe=True) or None
+
+async def extract_property(page: Union[Page, Frame], key: str, value: PropertyConfig, schema: ScrapingSchema, deadline: Optional[float] = None):
     try:
+        if "frame" in value:
+            return await extract_frame_property(page, key, value, schema, deadline)
+        
         if value["type"] == "regex":
             pattern = value.get("pattern")
             if not pattern:
@@ -423,13 +1333,17 @@ async def extract_property(page: Page, key: str, value: PropertyConfig, schema:
                 if decoded_results:
                     results.extend(decoded_results)
             
-            return list(set(results))
+            return list(dict.fromkeys(results))
+        
+        if value["type"] == "stories":
+            await wait_for_selector_until(page, value["selector"], deadline)
+            return await pair_stories(page, value)
         
         selector_type = value.get("selector_type", "css")
         selector = value["selector"]
         
         if selector_type == "css":
-            await page.wait_for_selector(selector, state="attached", timeout=20000).catch(lambda _: None)
+            await wait_for_selector_until(page, selector, deadline)
             elements = await page.query_selector_all(selector)
         elif selector_type == "xpath":
             elements = await page.locator(selector).all_inner_texts()
@@ -440,6 +1354,10 @@ async def extract_property(page: Page, key: str, value: PropertyConfig, schema:
             element = await page.query_selector(selector)
             if not element:
                 return None
+            
+            # Size-capped properties are read and truncated/digested inside the page
+            if value.get("max_bytes") is not None:
+                return await read_capped_text(element, value.get("attribute"), value, schema, page.url)
                 
             if "attribute" in value and element:
                 if value["attribute"] == "innerHTML":
@@ -471,7 +1389,11 @@ async def extract_property(page: Page, key: str, value: PropertyConfig, schema:
                 item = {}
                 for sub_key, sub_value in value["items"]["properties"].items():
                     sub_selector = sub_value["selector"]
-                    if sub_selector == "self":
+                    if sub_value.get("max_bytes") is not None:
+                        target = element if sub_selector == "self" else await element.query_selector(sub_selector)
+                        if target:
+                            item[sub_key] = await read_capped_text(target, sub_value.get("attribute"), sub_value, schema, page.url, strip=True)
+                    elif sub_selector == "self":
                         if "attribute" in sub_value:
                             if sub_value["attribute"] == "innerHTML":
                                 attr_value = await element.inner_html()
@@ -534,7 +1456,7 @@ async def extract_property(page: Page, key: str, value: PropertyConfig, schema:
         logger.error(f"Error extracting {key}: {str(e)}")
         return None
 
-async def perform_action(page: Page, action: ActionConfig):
+async def perform_action(page: Page, action: ActionConfig, wait_scale: float = 1.0, stop_event: Optional[asyncio.Event] = None):
     action_type = action.get("type")
     selector_type = action.get("selector_type", "css")
     selector = action.get("selector")
@@ -571,7 +1493,14 @@ async def perform_action(page: Page, action: ActionConfig):
                         await target_element.hover()
             
             if action_type == "wait":
-                await asyncio.sleep(duration)
+                if stop_event:
+                    # Cut the wait short once the thing we were waiting for has shown up
+                    try:
+                        await asyncio.wait_for(stop_event.wait(), duration * wait_scale)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await asyncio.sleep(duration * wait_scale)
             elif action_type == "scroll":
                 # Scroll to bottom of page to trigger lazy loading
                 await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
@@ -584,7 +1513,7 @@ async def perform_action(page: Page, action: ActionConfig):
             logger.warning(f"Attempt {attempt + 1} failed, retrying...")
             await asyncio.sleep(2 ** attempt)
 
-async def extract_post_action(page: Page, config: PostActionConfig):
+async def extract_post_action(page: Union[Page, Frame], config: PostActionConfig):
     selector_type = config.get("selector_type", "css")
     selector = config.get("selector")
     attribute = config.get("attribute")
@@ -611,38 +1540,578 @@ async def extract_post_action(page: Page, config: PostActionConfig):
                 if text and text.strip():
                     results.append(text.strip())
         
-        return list(set(results)) if results else None
+        return list(dict.fromkeys(results)) if results else None
     
     return None
 
-async def main():
-    logger.info(f"Enhanced scraper v{SCRIPT_VERSION} started at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC")
+# Elements whose text is never part of innerText, and block elements that break lines in it
+NON_RENDERED_TAGS = {"script", "style", "noscript", "template", "head"}
+BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "header", "footer", "nav", "ul", "ol", "table", "blockquote", "pre"}
+
+def node_inner_text(node) -> str:
+    """Approximate element.innerText for a parsed (not rendered) node."""
+    if node.tag in NON_RENDERED_TAGS:
+        return node.text(deep=True)
+    parts = []
+    for child in node.traverse(include_text=True):
+        if child.tag == "-text":
+            if child.parent is None or child.parent.tag not in NON_RENDERED_TAGS:
+                parts.append(child.text_content or "")
+        elif child.tag in BLOCK_TAGS and child is not node:
+            parts.append("\n")
+    # Collapse whitespace the way layout would
+    text = re.sub(r'[ \t\r\f\v]+', ' ', ''.join(parts))
+    return re.sub(r' *\n[\n ]*', '\n', text).strip()
+
+def read_node(node, attribute: Optional[str]) -> Optional[str]:
+    """Offline equivalent of inner_text()/inner_html()/get_attribute() on an element."""
+    if not attribute:
+        return node_inner_text(node)
+    if attribute == "innerHTML":
+        return node.inner_html
+    if attribute == "outerHTML":
+        return node.html
+    return node.attributes.get(attribute)
+
+def extract_property_offline(tree, base_url: str, key: str, value: PropertyConfig, schema: ScrapingSchema):
+    """Evaluate a property against a parsed snapshot, mirroring extract_property()."""
+    if "frame" in value:
+        # Snapshots only hold the main document
+        logger.warning(f"Skipping frame-scoped property {key} in offline mode")
+        return None
+    try:
+        if value["type"] == "regex":
+            pattern = value.get("pattern")
+            if not pattern:
+                raise ValueError(f"Regex pattern required for {key}")
+            results = []
+            regex = re.compile(pattern, re.IGNORECASE)
+            for node in tree.css(value["selector"]):
+                text = node.inner_html if "script" in value["selector"] or "iframe" in value["selector"] else node_inner_text(node)
+                matches = regex.findall(text or "")
+                if matches:
+                    results.extend(matches)
+            
+            # Process base64 if enabled
+            if value.get("process_base64", False) and schema.get("enable_base64_decode", False):
+                decoded_results = [decoded for decoded in map(try_decode_base64, results) if decoded]
+                results.extend(decoded_results)
+            
+            return list(dict.fromkeys(results))
+        
+        if value["type"] == "stories":
+            # Pairing scores rendered boxes, which a parsed snapshot doesn't have
+            logger.warning(f"Skipping stories property {key} in offline mode")
+            return None
+        
+        selector_type = value.get("selector_type", "css")
+        selector = value["selector"]
+        if selector_type != "css":
+            raise ValueError(f"Offline extraction only supports css selectors, got: {selector_type}")
+        
+        if value["type"] == "string":
+            node = tree.css_first(selector)
+            if not node:
+                return None
+            
+            text = read_node(node, value.get("attribute"))
+            if value.get("attribute") in ["href", "src", "data-src", "data-url"] and text:
+                text = urljoin(base_url, text)
+            if value.get("process_base64", False) and schema.get("enable_base64_decode", False) and text:
+                text = try_decode_base64(text) or text
+            return apply_size_cap(text, value, schema)
+        
+        elif value["type"] == "array":
+            result = []
+            filter_pattern = re.compile(value["filter"]["pattern"], re.IGNORECASE) if "filter" in value else None
+            
+            for node in tree.css(selector):
+                item = {}
+                for sub_key, sub_value in value["items"]["properties"].items():
+                    sub_selector = sub_value["selector"]
+                    target = node if sub_selector == "self" else node.css_first(sub_selector)
+                    if not target:
+                        continue
+                    
+                    attribute = sub_value.get("attribute")
+                    attr_value = read_node(target, attribute)
+                    if not attribute:
+                        attr_value = attr_value.strip()
+                    elif attribute in ["href", "src", "data-src", "data-url"] and attr_value:
+                        attr_value = urljoin(base_url, attr_value)
+                    if sub_value.get("process_base64", False) and schema.get("enable_base64_decode", False) and attr_value:
+                        attr_value = try_decode_base64(attr_value) or attr_value
+                    item[sub_key] = apply_size_cap(attr_value, sub_value, schema)
+                
+                # Apply filter if specified
+                if filter_pattern:
+                    filter_attr = item.get(value["filter"]["attribute"], "")
+                    if not filter_pattern.search(filter_attr or ""):
+                        continue
+                
+                # Skip empty links
+                if key == "links" and (not item.get("text") or item["text"].strip() == ""):
+                    continue
+                
+                result.append(item)
+            return result
+    except Exception as e:
+        logger.error(f"Error extracting {key} offline: {str(e)}")
+        return None
+
+def extract_post_action_offline(tree, base_url: str, config: PostActionConfig):
+    """Evaluate a selector post-action against a parsed snapshot, mirroring extract_post_action()."""
+    if config.get("selector_type", "css") != "css" or not config.get("selector"):
+        return None
+    attribute = config.get("attribute")
+    results = []
+    for node in tree.css(config["selector"]):
+        if attribute:
+            value = read_node(node, attribute)
+            if value and attribute in ["href", "src", "data-src", "data-url"]:
+                results.append(urljoin(base_url, value))
+        else:
+            text = node_inner_text(node)
+            if text and text.strip():
+                results.append(text.strip())
+    return list(dict.fromkeys(results)) if results else None
+
+def extract_snapshot(store: SnapshotStore, url: str, schema: ScrapingSchema) -> Dict[str, Any]:
+    """Run a schema's properties and post-actions against one saved snapshot."""
+    snapshot = store.load(url)
+    if snapshot is None:
+        error_data = {key: None for key in schema["properties"]}
+        error_data["error"] = f"No snapshot saved for {url}"
+        return error_data
     
+    tree = HTMLParser(snapshot["html"])
+    base_url = snapshot["final_url"]
+    network_log = snapshot["network"]
+    data = {key: extract_property_offline(tree, base_url, key, value, schema) for key, value in schema["properties"].items()}
+    
+    media_urls = {
+        entry["url"] for entry in network_log
+        if is_valid_media_url(entry["url"]) or is_media_content_type(entry.get("content_type", ""))
+    }
+    hidden_links: Set[str] = set()
+    decoded_urls: Set[str] = set()
+    
+    if schema.get("enable_hidden_links", False) or schema.get("enable_base64_decode", False):
+        script_contents = '\n'.join(node.text(deep=True) for node in tree.css('script:not([src])'))
+        if schema.get("enable_hidden_links", False):
+            hidden_links.update(extract_urls_from_text(script_contents, url))
+        if schema.get("enable_base64_decode", False):
+            decoded_urls = find_base64_urls(snapshot["html"], script_contents)
+            for decoded in decoded_urls:
+                media_urls.update(u for u in extract_urls_from_text(decoded) if is_valid_media_url(u))
+    
+    if "post_actions" in schema:
+        for key, config in schema["post_actions"].items():
+            if config.get("type") == "network":
+                if config.get("media_only", False):
+                    data[key] = [media_url for media_url in media_urls if re.search(config.get("pattern", ""), media_url)]
+                else:
+                    data[key] = extract_network_requests(network_log, config)
+            elif config.get("type") == "mutations":
+                data[key] = None  # Only observable in a live page
+            else:
+                data[key] = extract_post_action_offline(tree, base_url, config)
+    
+    if schema.get("enable_media_capture", False):
+        data["media_urls"] = sorted(media_urls)
+    if schema.get("enable_hidden_links", False):
+        data["hidden_links"] = sorted(hidden_links)
+    if schema.get("enable_base64_decode", False):
+        data["decoded_urls"] = sorted(decoded_urls)
+    return data
+
+def run_offline(schema: ScrapingSchema, options: RunOptions) -> List[Dict[str, Any]]:
+    """Re-run a schema against the snapshot store on a thread pool, without a browser or network."""
+    if HTMLParser is None:
+        raise ScrapingError("Offline extraction requires selectolax (pip install selectolax).")
+    if schema.get("scan_javascript", False):
+        logger.warning("scan_javascript fetches external scripts and is skipped in offline mode")
+    
+    start_time = datetime.now(timezone.utc)
+    store = SnapshotStore(options.get("snapshot_dir") or DEFAULT_SNAPSHOT_DIR)
+    urls = get_schema_urls(schema)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=options.get("workers")) as pool:
+        all_data = list(pool.map(lambda url: extract_snapshot(store, url, schema), urls))
+    
+    duration = (datetime.now(timezone.utc) - start_time).total_seconds()
+    logger.info(f"Offline extraction of {len(urls)} snapshots completed in {duration:.2f} seconds")
+    return all_data
+
+# How often --watch looks at the schema file's modification time
+WATCH_POLL_INTERVAL = 0.2
+# The page is already loaded, so a selector that isn't there by now won't show up
+WATCH_EXTRACTION_DEADLINE = 2.0
+# Schema keys whose edits need the page loaded again; other edits re-run against the live page
+WATCH_RELOAD_KEYS = ["url", "url_template", "url_range", "actions", "load_strategy", "static", "mutation_capture", "max_page_scroll"]
+# Top-level keys that change how every property is extracted, so editing one re-runs them all
+WATCH_RERUN_KEYS = ["enable_base64_decode", "blob_store"]
+
+def read_schema_file(path: str) -> Optional[ScrapingSchema]:
     try:
-        with open("schema.json", "r", encoding="utf-8") as f:
+        with open(path, "r", encoding="utf-8") as f:
             schema = json.load(f)
-    except FileNotFoundError:
-        logger.error("Error: schema.json not found.")
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Could not load {path}: {e}")
+        return None
+    # Typos surface here, before any browser launches, instead of as empty results minutes later
+    errors = validate_schema(schema, path)
+    if errors:
+        for error in errors:
+            logger.error(error)
+        logger.error(f"{path} is not a valid schema ({len(errors)} problems)")
+        return None
+    for warning in schema_warnings(schema, path):
+        logger.warning(warning)
+    return schema
+
+# Invalid records logged in full per run; the rest are only counted
+MAX_LOGGED_INVALID_RECORDS = 10
+
+class RecordValidation:
+    """Checks output records against the schema's declared property types as they are written."""
+
+    def __init__(self, schema: ScrapingSchema):
+        self.validate_record = compile_record_validator(schema)
+        self.records = 0
+        self.invalid = 0
+
+    def check(self, record: Dict[str, Any]) -> List[str]:
+        errors = self.validate_record(record, f"data[{self.records}]")
+        self.records += 1
+        if errors:
+            self.invalid += 1
+            if self.invalid <= MAX_LOGGED_INVALID_RECORDS:
+                for error in errors:
+                    logger.warning(f"Invalid output: {error}")
+        return errors
+
+    def summary(self) -> Dict[str, int]:
+        if self.invalid:
+            logger.warning(f"{self.invalid} of {self.records} records failed validation")
+        return {"records": self.records, "invalid": self.invalid}
+
+def changed_keys(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    return [key for key in new if key not in old or old[key] != new[key]]
+
+def summarize_value(value: Any) -> str:
+    if isinstance(value, list):
+        return f"{len(value)} items"
+    if isinstance(value, str):
+        return repr(value if len(value) <= 60 else value[:57] + "...")
+    return json.dumps(value, ensure_ascii=False)[:60]
+
+def describe_change(old: Any, new: Any) -> str:
+    """One-line summary of how a re-run value differs from the last one."""
+    if old == new:
+        return "unchanged"
+    summary = summarize_value(new)
+    ops = structural_diff(old, new)
+    counts = {kind: sum(1 for op in ops if op[0] == kind) for kind in ("add", "remove", "replace")}
+    return f"{summary} (+{counts['add']} -{counts['remove']} ~{counts['replace']})"
+
+class WatchedPage:
+    """One page loaded with the schema's navigation and actions, kept open between schema edits."""
+
+    def __init__(self, context: BrowserContext, wait_scale: float = 1.0):
+        self.context = context
+        self.wait_scale = wait_scale
+        self.page: Optional[Page] = None
+        self.capture: Optional[MutationCapture] = None
+        self.loaded = False
+        self.network_log: List[Dict[str, Any]] = []
+        self.values: Dict[str, Any] = {}
+    
+    async def load(self, schema: ScrapingSchema):
+        self.loaded = False
+        if self.page:
+            await self.page.close()
+        self.page = await self.context.new_page()
+        self.network_log = []
+        self.values = {}
+        self.page.on("request", lambda request: self.network_log.append({"method": request.method, "url": request.url, "resource_type": request.resource_type}))
+        # Same page preparation as a real run, so re-run values match what scrape_url would see
+        self.capture = await install_mutation_capture(self.page, schema)
+        url = get_schema_urls(schema)[0]
+        load_config = normalize_load_config(schema.get("load_strategy"), default="domcontentloaded" if schema.get("static") else "networkidle")
+        strategy = candidate_strategies(load_config)[0] if load_config["type"] == "auto" else load_config["type"]
+        started = asyncio.get_running_loop().time()
+        await load_page(self.page, url, strategy, load_config)
+        await scroll_page(self.page, schema, bool(schema.get("static")), self.wait_scale)
+        await run_actions(self.page, schema, self.wait_scale, self.capture)
+        self.loaded = True
+        print(f"Loaded {url} with '{strategy}' in {asyncio.get_running_loop().time() - started:.2f}s")
+    
+    async def run(self, schema: ScrapingSchema, properties: List[str], post_actions: List[str]):
+        """Re-run the given entries against the live page, printing each one's time and what changed."""
+        loop = asyncio.get_running_loop()
+        for kind, keys in (("property", properties), ("post_action", post_actions)):
+            for key in keys:
+                started = loop.time()
+                if kind == "property":
+                    value = await extract_property(self.page, key, schema["properties"][key], schema, loop.time() + WATCH_EXTRACTION_DEADLINE)
+                else:
+                    config = schema["post_actions"][key]
+                    if config.get("type") == "network":
+                        value = extract_network_requests(self.network_log, config)
+                    elif config.get("type") == "mutations":
+                        value = self.capture.captured(config.get("pattern")) if self.capture else None
+                    elif "frame" in config:
+                        value = await extract_frame_post_action(self.page, config, loop.time() + WATCH_EXTRACTION_DEADLINE)
+                    else:
+                        value = await extract_post_action(self.page, config)
+                elapsed_ms = (loop.time() - started) * 1000
+                label = f"{kind}:{key}"
+                change = describe_change(self.values[label], value) if label in self.values else summarize_value(value)
+                print(f"  {label:<32} {elapsed_ms:>8.1f} ms  {change}")
+                self.values[label] = value
+
+async def watch_schema(path: str, options: RunOptions):
+    """Keep a browser and the schema's page open, re-running edited properties and post_actions on save."""
+    schema = read_schema_file(path)
+    if schema is None:
         return
-    except json.JSONDecodeError:
-        logger.error("Error: Invalid JSON in schema.json.")
+    wait_scale = options.get("wait_scale", 1.0)
+    async with async_playwright() as p:
+        context, browser = await create_browser_context(p, static=bool(schema.get("static")), profile_name=options.get("browser_profile"))
+        watched = WatchedPage(context, wait_scale)
+        try:
+            await watched.load(schema)
+            await watched.run(schema, list(schema["properties"]), list(schema.get("post_actions", {})))
+            mtime = os.stat(path).st_mtime_ns
+            print(f"Watching {path} for changes (Ctrl-C to stop)")
+            while True:
+                await asyncio.sleep(WATCH_POLL_INTERVAL)
+                try:
+                    current = os.stat(path).st_mtime_ns
+                except FileNotFoundError:
+                    continue  # Editors that save by rename briefly remove the file
+                if current == mtime:
+                    continue
+                mtime = current
+                new_schema = read_schema_file(path)
+                if new_schema is None:
+                    continue
+                print(f"{datetime.now().strftime('%H:%M:%S')} {path} changed")
+                try:
+                    if bool(new_schema.get("static")) != bool(schema.get("static")):
+                        await context.close()
+                        await browser.close()
+                        context, browser = await create_browser_context(p, static=bool(new_schema.get("static")), profile_name=options.get("browser_profile"))
+                        watched = WatchedPage(context, wait_scale)
+                    if not watched.loaded or any(new_schema.get(key) != schema.get(key) for key in WATCH_RELOAD_KEYS):
+                        await watched.load(new_schema)
+                        properties, post_actions = list(new_schema["properties"]), list(new_schema.get("post_actions", {}))
+                    else:
+                        if any(new_schema.get(key) != schema.get(key) for key in WATCH_RERUN_KEYS):
+                            properties = list(new_schema["properties"])
+                        else:
+                            properties = changed_keys(schema["properties"], new_schema["properties"])
+                        post_actions = changed_keys(schema.get("post_actions", {}), new_schema.get("post_actions", {}))
+                        for key in set(schema["properties"]) - set(new_schema["properties"]):
+                            watched.values.pop(f"property:{key}", None)
+                            print(f"  property:{key} removed")
+                        for key in set(schema.get("post_actions", {})) - set(new_schema.get("post_actions", {})):
+                            watched.values.pop(f"post_action:{key}", None)
+                            print(f"  post_action:{key} removed")
+                        if not properties and not post_actions:
+                            print("  nothing to re-run")
+                    await watched.run(new_schema, properties, post_actions)
+                except Exception as e:
+                    # A broken edit shouldn't end the session; fix the schema and save again
+                    logger.error(f"Re-run failed: {e}")
+                schema = new_schema
+        finally:
+            await context.close()
+            await browser.close()
+
+# How long an idle --wait worker sleeps before asking the queue again
+QUEUE_POLL_INTERVAL = 5.0
+
+async def run_queue_worker(queue: JobQueue, sink: JsonlSink, options: RunOptions, jobs: int = 1, wait: bool = False,
+                           visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT) -> Dict[str, int]:
+    """Lease (schema, URL) jobs until the queue is drained, streaming each result to the sink before acking it."""
+    name = worker_name()
+    sessions: Dict[str, Tuple[ScrapeSession, BrowserContext, Browser]] = {}
+    sessions_lock = asyncio.Lock()
+    counts = {"done": 0, "retried": 0}
+    record_validators: Dict[str, Any] = {}  # schema id -> compiled validator, with --validate
+    load_stats = LoadStats(options.get("load_stats_file") or LOAD_STATS_FILE)
+    
+    async with async_playwright() as p:
+        async def session_for(job: Job) -> Tuple[ScrapeSession, BrowserContext]:
+            # One session and browser per distinct schema, kept warm for all of its jobs
+            async with sessions_lock:
+                if job.schema_id not in sessions:
+                    session = ScrapeSession(job.schema, options, load_stats=load_stats)
+                    context, browser = await create_browser_context(
+                        p,
+                        block_service_workers=session.har_mode,
+                        static=session.static,
+                        profile_name=options.get("browser_profile")
+                    )
+                    sessions[job.schema_id] = (session, context, browser)
+            session, context, _ = sessions[job.schema_id]
+            return session, context
+        
+        async def heartbeat(job: Job):
+            # Keep the job hidden from other workers while a slow page is still running
+            while True:
+                await asyncio.sleep(visibility_timeout / 3)
+                if not queue.extend(job, visibility_timeout):
+                    logger.warning(f"Lost the lease on job {job.id} ({job.url}); another worker may redo it")
+                    return
+        
+        async def work():
+            while True:
+                job = queue.lease(name, visibility_timeout)
+                if job is None:
+                    if not wait:
+                        return
+                    await asyncio.sleep(QUEUE_POLL_INTERVAL)
+                    continue
+                beat = asyncio.create_task(heartbeat(job))
+                try:
+                    session, context = await session_for(job)
+                    data = await scrape_url(session, context, job.url)
+                    # Failed loads go back on the queue; definite answers (incl. 404s) are results
+                    if data.get("error") and "status" not in data and job.attempts < queue.max_attempts:
+                        queue.fail(job, data["error"])
+                        counts["retried"] += 1
+                        continue
+                    line = {"job": job.id, "schema": job.schema_id, "url": job.url, "attempt": job.attempts, "worker": name, "data": data}
+                    if options.get("validate"):
+                        if job.schema_id not in record_validators:
+                            record_validators[job.schema_id] = compile_record_validator(job.schema)
+                        errors = record_validators[job.schema_id](data, "data")
+                        if errors:
+                            logger.warning(f"Job {job.id} ({job.url}) output failed validation: {'; '.join(errors)}")
+                            line["validation_errors"] = errors
+                    sink.write(line)
+                    queue.ack(job)
+                    counts["done"] += 1
+                except Exception as e:
+                    logger.error(f"Job {job.id} ({job.url}) failed: {str(e)}", exc_info=True)
+                    queue.fail(job, str(e))
+                    counts["retried"] += 1
+                finally:
+                    beat.cancel()
+        
+        try:
+            await asyncio.gather(*(work() for _ in range(max(1, jobs))))
+        finally:
+            for session, context, browser in sessions.values():
+                session.close()
+                await context.close()
+                await browser.close()
+            load_stats.save()
+    return counts
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=f"Enhanced scraper v{SCRIPT_VERSION}")
+    parser.add_argument("--schema", default="schema.json", help="Schema file to run")
+    parser.add_argument("--output", default="output.json", help="Where to write the results")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="Output format (default: from the --output extension; .db/.sqlite gives normalized tables, .parquet needs pyarrow; published writes JSON only when the data changed, with run metadata in a .meta.json sidecar)")
+    parser.add_argument("--snapshot-dir", help="Save each page's HTML and network log to this snapshot store")
+    parser.add_argument("--offline", action="store_true", help="Extract from saved snapshots instead of live pages (no browser or network)")
+    parser.add_argument("--workers", type=int, help="Thread pool size for offline extraction")
+    har_group = parser.add_mutually_exclusive_group()
+    har_group.add_argument("--record", metavar="HAR_DIR", help="Record each page's network traffic as a HAR archive in this directory")
+    har_group.add_argument("--replay", metavar="HAR_DIR", help="Serve each page's traffic from recorded HARs; the real network is never touched")
+    parser.add_argument("--load-stats", default=LOAD_STATS_FILE, help="File holding per-host load timings for the 'auto' load strategy")
+    parser.add_argument("--wait-scale", type=float, default=1.0, help="Multiplier for fixed waits (e.g. 0.2 when replaying, since responses are local)")
+    queue_group = parser.add_mutually_exclusive_group()
+    queue_group.add_argument("--enqueue", metavar="QUEUE", help="Add a job per URL of the schema to this job queue (e.g. jobs.db) and exit")
+    queue_group.add_argument("--work", metavar="QUEUE", help="Run queued jobs from this job queue, streaming results to --sink")
+    parser.add_argument("--sink", default="results.jsonl", help="JSON Lines file queue workers append results to")
+    parser.add_argument("--jobs", type=int, default=1, help="Jobs a queue worker runs at once")
+    parser.add_argument("--wait", action="store_true", help="Keep a queue worker polling after the queue is drained")
+    parser.add_argument("--visibility-timeout", type=float, default=DEFAULT_VISIBILITY_TIMEOUT, help="Seconds before a crashed worker's job is handed out again")
+    parser.add_argument("--max-age", type=float, help="Reuse cached page results up to this many seconds old (overrides the schema's cache ttl; 0 forces a refresh)")
+    parser.add_argument("--cache-file", help="Result cache database (default: the schema's cache.file, else result_cache.db)")
+    parser.add_argument("--validate", action="store_true", help="Check every output record against the schema's property types and report the paths that don't match")
+    parser.add_argument("--watch", action="store_true", help="Keep the schema's page open and re-run edited properties/post_actions each time the schema file is saved")
+    parser.add_argument("--profile", choices=list(BROWSER_PROFILES), help="Browser profile (default: $BROWSER_PROFILE, else 'default'); compare them with browser_profiles.py")
+    return parser.parse_args()
+
+async def main():
+    args = parse_args()
+    logger.info(f"Enhanced scraper v{SCRIPT_VERSION} started at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC")
+    
+    options: RunOptions = {
+        "snapshot_dir": args.snapshot_dir,
+        "offline": args.offline,
+        "workers": args.workers,
+        "record_har": args.record,
+        "replay_har": args.replay,
+        "wait_scale": args.wait_scale,
+        "load_stats_file": args.load_stats,
+        "browser_profile": args.profile,
+        "cache_file": args.cache_file,
+        "max_age": args.max_age,
+        "validate": args.validate
+    }
+    
+    if args.watch:
+        await watch_schema(args.schema, options)
+        return
+    
+    # Queue workers get their schemas from the jobs
+    if args.work:
+        queue = open_job_queue(args.work)
+        try:
+            with JsonlSink(args.sink) as sink:
+                counts = await run_queue_worker(queue, sink, options, args.jobs, args.wait, args.visibility_timeout)
+            logger.info(f"Worker finished: {counts['done']} jobs done, {counts['retried']} handed back; queue now {queue.stats()}")
+        finally:
+            queue.close()
+        return
+    
+    schema = read_schema_file(args.schema)
+    if schema is None:
         return
     
+    if args.enqueue:
+        if (schema.get("url_range") or {}).get("max_misses"):
+            logger.warning("url_range.max_misses only applies to single-process runs; every queued id will be scraped")
+        queue = open_job_queue(args.enqueue)
+        try:
+            added = queue.enqueue(schema, get_schema_urls(schema))
+            logger.info(f"Queued {added} jobs in {args.enqueue}; queue now {queue.stats()}")
+        finally:
+            queue.close()
+        return
+    
+    metrics: Dict[str, Any] = {}
     try:
-        data = await scrape_website(schema)
+        if options["offline"]:
+            data = run_offline(schema, options)
+        else:
+            data = await scrape_website(schema, options, metrics)
         if data is None:
             data = [{key: None for key in schema["properties"]}]
+        metadata = {
+            "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            "version": SCRIPT_VERSION,
+            "url": schema.get("url") or schema.get("url_template")
+        }
+        validation = RecordValidation(schema) if args.validate else None
+        if metrics or validation:
+            metadata["metrics"] = metrics
         
-        output_file = "output.json"
-        with open(output_file, "w", encoding="utf-8") as outfile:
-            json.dump({
-                "metadata": {
-                    "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
-                    "version": SCRIPT_VERSION,
-                    "url": schema.get("url") or schema.get("url_template")
-                },
-                "data": data
-            }, outfile, indent=2, ensure_ascii=False)
+        output_file = args.output
+        with open_output(output_file, schema, metadata, args.format) as output:
+            for record in data:
+                if validation:
+                    validation.check(record)
+                output.write(record)
+            if validation:
+                # Backends that keep the metadata until close (JSON) pick this up
+                metrics["validation"] = validation.summary()
         
         # Also create a media-specific output file if media capture is enabled
         if schema.get("enable_media_capture", False):
@@ -657,7 +2126,7 @@ async def main():
                     json.dump({
                         "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
                         "media_count": len(media_urls),
-                        "media_urls": list(media_urls)
+                        "media_urls": sorted(media_urls)
                     }, media_outfile, indent=2, ensure_ascii=False)
                 logger.info(f"Media URLs saved to {media_output}")
         
@@ -0,0 +1,128 @@
+import logging
+from typing import Dict, List, Any, Union
+from playwright.async_api import Page, Frame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TITLE_SELECTOR = "h1, h2, h3"
+DEFAULT_ARTICLE_SELECTOR = "p"
+DEFAULT_IMAGE_SELECTOR = "img"
+DEFAULT_MAX_DISTANCE = 300  # px between an image's box and a story's box
+DEFAULT_MIN_IMAGE_AREA = 2500  # px²; smaller images are icons, avatars and pixels
+DEFAULT_MIN_SCORE = 0.3
+DEFAULT_WEIGHTS = {"ancestry": 1.0, "proximity": 0.6, "alt": 0.8}
+
+# Runs in one evaluate: every box and text is read once, candidate pairs are scored,
+# and pairs are taken best-first so each story gets at most one image and vice versa
+STORY_PAIRING_JS = """
+(config) => {
+    const started = performance.now();
+    const words = (text) => new Set((text || '').toLowerCase().match(/[\\p{L}\\p{N}]{3,}/gu) || []);
+    const absolute = (url) => { try { return new URL(url, document.baseURI).href; } catch (e) { return null; } };
+
+    const images = [];
+    for (const el of document.querySelectorAll(config.image_selector)) {
+        const raw = el.currentSrc || el.getAttribute('src') || el.getAttribute('data-src');
+        if (!raw || raw.startsWith('data:')) continue;
+        const box = el.getBoundingClientRect();
+        const area = Math.max(
+            box.width * box.height,
+            (el.naturalWidth || 0) * (el.naturalHeight || 0),
+            (parseInt(el.getAttribute('width')) || 0) * (parseInt(el.getAttribute('height')) || 0)
+        );
+        if (area < config.min_image_area) continue;
+        images.push({
+            el,
+            url: absolute(raw),
+            // Unrendered (hidden or not yet laid out) images can still pair by ancestry or alt text
+            box: box.width || box.height ? box : null,
+            words: words((el.getAttribute('alt') || '') + ' ' + (el.getAttribute('title') || ''))
+        });
+    }
+
+    const stories = [];
+    const titles = new Set();
+    for (const el of document.querySelectorAll(config.selector)) {
+        const titleEl = el.querySelector(config.title_selector);
+        // Nested containers share a heading; the outermost one wins
+        if (!titleEl || titles.has(titleEl)) continue;
+        const title = titleEl.innerText.trim();
+        if (!title) continue;
+        titles.add(titleEl);
+        const article = Array.from(el.querySelectorAll(config.article_selector))
+            .map(p => p.innerText.trim()).filter(Boolean).join('\\n');
+        const box = el.getBoundingClientRect();
+        stories.push({el, title, article, box: box.width || box.height ? box : null, words: words(title)});
+    }
+
+    const ancestry = (story, image) => {
+        if (story.el.contains(image.el)) return 1;
+        // An image a few levels up from the story (a sibling wrapper) still counts, fading with distance
+        let node = image.el.parentElement;
+        for (let hops = 1; node && hops <= 3; hops++, node = node.parentElement) {
+            if (node === document.body) break;
+            if (node.contains(story.el)) return 1 - hops / 4;
+        }
+        return 0;
+    };
+    const proximity = (a, b) => {
+        if (!a || !b) return 0;
+        const dx = Math.max(0, a.left - b.right, b.left - a.right);
+        const dy = Math.max(0, a.top - b.bottom, b.top - a.bottom);
+        const distance = Math.hypot(dx, dy);
+        return distance >= config.max_distance ? 0 : 1 - distance / config.max_distance;
+    };
+    const overlap = (titleWords, altWords) => {
+        if (!titleWords.size || !altWords.size) return 0;
+        let shared = 0;
+        for (const word of altWords) if (titleWords.has(word)) shared++;
+        return shared / Math.min(titleWords.size, altWords.size);
+    };
+
+    const weights = config.weights;
+    const pairs = [];
+    stories.forEach((story, s) => {
+        images.forEach((image, i) => {
+            const near = proximity(story.box, image.box);
+            const alt = overlap(story.words, image.words);
+            // Only pairs that are close, textually related or nested are worth the ancestry walk
+            if (!near && !alt && !story.el.contains(image.el)) return;
+            const score = weights.ancestry * ancestry(story, image) + weights.proximity * near + weights.alt * alt;
+            if (score >= config.min_score) pairs.push([score, s, i]);
+        });
+    });
+    pairs.sort((a, b) => b[0] - a[0]);
+
+    const imageFor = new Map();
+    const taken = new Set();
+    for (const [score, s, i] of pairs) {
+        if (imageFor.has(s) || taken.has(i)) continue;
+        imageFor.set(s, images[i].url);
+        taken.add(i);
+    }
+
+    return {
+        stories: stories.map((story, s) => ({title: story.title, image: imageFor.get(s) || null, article: story.article})),
+        candidates: pairs.length,
+        ms: performance.now() - started
+    };
+}
+"""
+
+def pairing_config(value: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "selector": value["selector"],
+        "title_selector": value.get("title_selector", DEFAULT_TITLE_SELECTOR),
+        "article_selector": value.get("article_selector", DEFAULT_ARTICLE_SELECTOR),
+        "image_selector": value.get("image_selector", DEFAULT_IMAGE_SELECTOR),
+        "max_distance": value.get("max_distance", DEFAULT_MAX_DISTANCE),
+        "min_image_area": value.get("min_image_area", DEFAULT_MIN_IMAGE_AREA),
+        "min_score": value.get("min_score", DEFAULT_MIN_SCORE),
+        "weights": {**DEFAULT_WEIGHTS, **value.get("weights", {})}
+    }
+
+async def pair_stories(page: Union[Page, Frame], value: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Stories ({title, image, article}) from the page's containers, each paired with its best image."""
+    result = await page.evaluate(STORY_PAIRING_JS, pairing_config(value))
+    logger.debug(f"Paired {len(result['stories'])} stories from {result['candidates']} candidate pairs in {result['ms']:.1f} ms")
+    return result["stories"]